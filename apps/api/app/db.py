@@ -1,19 +1,35 @@
 from contextlib import contextmanager
-import json
-import psycopg2
-from psycopg2 import pool
-from psycopg2.extras import Json
+import orjson
+from psycopg.types.json import Jsonb, set_json_dumps, set_json_loads
+from psycopg_pool import ConnectionPool
 from .settings import settings
 
 _pool = None
 
 
+def _json_dumps(obj) -> bytes:
+    # numpy scalars from the pipeline serialize as-is; NaN becomes null, which jsonb accepts
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Every Jsonb parameter and JSONB result column goes through orjson instead of stdlib json
+set_json_dumps(_json_dumps)
+set_json_loads(orjson.loads)
+
+
+def _open_pool():
+    # prepare_threshold: statements executed this many times on a connection get
+    # server-side prepared, which covers the hot per-run lookups.
+    return ConnectionPool(settings.database_url, min_size=1, max_size=5,
+                          kwargs={"prepare_threshold": 5}, open=True)
+
+
 def init_db():
     global _pool
     if _pool is None:
-        _pool = pool.SimpleConnectionPool(1, 5, settings.database_url)
+        _pool = _open_pool()
     with get_conn() as conn:
-        with conn.cursor() as cur:
+        with conn.pipeline(), conn.cursor() as cur:
             cur.execute("CREATE EXTENSION IF NOT EXISTS postgis;")
             cur.execute(
                 """
@@ -37,7 +53,17 @@ def init_db():
                 );
                 """
             )
-            cur.execute("ALTER TABLE runs ADD COLUMN IF NOT EXISTS aoi_name TEXT;")
+            # Only pre-aoi_name databases need the ALTER; skip its ACCESS EXCLUSIVE lock otherwise.
+            cur.execute(
+                """
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema()
+                  AND table_name = 'runs' AND column_name = 'aoi_name'
+                LIMIT 1;
+                """
+            )
+            if cur.fetchone() is None:
+                cur.execute("ALTER TABLE runs ADD COLUMN IF NOT EXISTS aoi_name TEXT;")
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS targets (
@@ -55,6 +81,20 @@ def init_db():
                 );
                 """
             )
+            # covers get_targets_geojson's WHERE run_id ... ORDER BY without a sort step
+            cur.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_targets_run_score
+                ON targets (run_id, mean_score DESC, area_km2 DESC);
+                """
+            )
+            # @> containment lookups on evidence chips
+            cur.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_targets_evidence_summary_gin
+                ON targets USING GIN (evidence_summary jsonb_path_ops);
+                """
+            )
         conn.commit()
 
 
@@ -62,33 +102,32 @@ def init_db():
 def get_conn():
     global _pool
     if _pool is None:
-        _pool = pool.SimpleConnectionPool(1, 5, settings.database_url)
-    conn = _pool.getconn()
-    try:
+        _pool = _open_pool()
+    with _pool.connection() as conn:
         yield conn
-    finally:
-        _pool.putconn(conn)
 
 
 def create_run(run):
+    # The AOI is sent once as JSONB; PostGIS pulls the geometry out of it server-side.
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
                 INSERT INTO runs (id, status, mode, aoi_name, aoi_geojson, aoi_geom, bbox, params, progress)
-                VALUES (%s, %s, %s, %s, %s, ST_GeomFromGeoJSON(%s), %s, %s, %s)
+                VALUES (%(id)s, %(status)s, %(mode)s, %(aoi_name)s, %(aoi)s,
+                        ST_GeomFromGeoJSON(COALESCE(%(aoi)s->'geometry', %(aoi)s)),
+                        %(bbox)s, %(params)s, %(progress)s)
                 """,
-                (
-                    run["id"],
-                    run["status"],
-                    run["mode"],
-                    run.get("aoi_name"),
-                    Json(run["aoi_geojson"]),
-                    json.dumps(run["aoi_geojson"]["geometry"]) if "geometry" in run["aoi_geojson"] else json.dumps(run["aoi_geojson"]),
-                    Json(run.get("bbox")),
-                    Json(run.get("params")),
-                    Json(run.get("progress")),
-                ),
+                {
+                    "id": run["id"],
+                    "status": run["status"],
+                    "mode": run["mode"],
+                    "aoi_name": run.get("aoi_name"),
+                    "aoi": Jsonb(run["aoi_geojson"]),
+                    "bbox": Jsonb(run.get("bbox")),
+                    "params": Jsonb(run.get("params")),
+                    "progress": Jsonb(run.get("progress")),
+                },
             )
         conn.commit()
 
@@ -101,7 +140,7 @@ def update_run(run_id, **fields):
     for k, v in fields.items():
         cols.append(f"{k} = %s")
         if isinstance(v, (dict, list)):
-            vals.append(Json(v))
+            vals.append(Jsonb(v))
         else:
             vals.append(v)
     vals.append(run_id)
@@ -112,30 +151,67 @@ def update_run(run_id, **fields):
         conn.commit()
 
 
-def insert_targets(run_id, targets):
+def advance_progress(run_id, step, default_steps):
+    """Mark `step` running and every step before it done, in a single UPDATE."""
+    # steps that precede `step` in template order; covers steps whose own update was coalesced away
+    order = list(default_steps)
+    earlier = order[:order.index(step)] if step in order else []
     with get_conn() as conn:
         with conn.cursor() as cur:
-            for t in targets:
-                cur.execute(
-                    """
-                    INSERT INTO targets (id, run_id, geom, area_km2, centroid, mean_score, max_score,
-                                         distance_to_road_m, distance_to_river_m, evidence, evidence_summary)
-                    VALUES (%s, %s, ST_GeomFromText(%s, 4326), %s, ST_GeomFromText(%s, 4326), %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        t["id"],
-                        run_id,
-                        t["wkt"],
-                        t["area_km2"],
-                        t["centroid_wkt"],
-                        t["mean_score"],
-                        t["max_score"],
-                        t.get("distance_to_road_m"),
-                        t.get("distance_to_river_m"),
-                        Json(t.get("evidence")),
-                        Json(t.get("evidence_summary")),
-                    ),
+            cur.execute(
+                """
+                UPDATE runs SET progress = jsonb_set(
+                    COALESCE(progress, '{}'::jsonb),
+                    '{steps}',
+                    COALESCE(
+                        (
+                            SELECT jsonb_object_agg(
+                                k,
+                                CASE WHEN k = %s THEN 'running'
+                                     WHEN v = 'running' OR k = ANY(%s) THEN 'done' ELSE v END
+                            )
+                            FROM jsonb_each_text(COALESCE(progress->'steps', %s)) AS s(k, v)
+                        ),
+                        '{}'::jsonb
+                    )
                 )
+                WHERE id = %s
+                """,
+                (step, earlier, Jsonb(default_steps), run_id),
+            )
+        conn.commit()
+
+
+def _nan_to_null(value):
+    # No line to measure to comes back as NaN; store NULL so the GeoJSON carries null, not "NaN"
+    return None if value is None or value != value else value
+
+
+def insert_targets(run_id, ids, wkbs, centroid_wkbs, areas, mean_scores, max_scores,
+                   road_dists, river_dists, evidence, evidence_summary):
+    """Bulk-insert targets given as parallel columns (one sequence per table column)."""
+    if not len(ids):
+        return
+    # Serialize the JSONB columns before checking a connection out of the pool; in text COPY
+    # the JSON text is passed through as-is and parsed by jsonb's input function.
+    evidence = [_json_dumps(e).decode() for e in evidence]
+    evidence_summary = [_json_dumps(c).decode() for c in evidence_summary]
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            with cur.copy(
+                """
+                COPY targets (id, run_id, geom, area_km2, centroid, mean_score, max_score,
+                              distance_to_road_m, distance_to_river_m, evidence, evidence_summary)
+                FROM STDIN
+                """
+            ) as copy:
+                # COPY goes through the geometry input function, which parses hex EWKB
+                # directly (no WKT text parsing on the server).
+                for row in zip(ids, wkbs, areas, centroid_wkbs, mean_scores, max_scores,
+                               road_dists, river_dists, evidence, evidence_summary):
+                    tid, geom, area, centroid, mean, mx, road, river, ev, chips = row
+                    copy.write_row((tid, run_id, geom, area, centroid, mean, mx,
+                                    _nan_to_null(road), _nan_to_null(river), ev, chips))
         conn.commit()
 
 
@@ -196,37 +272,96 @@ def get_run(run_id):
     }
 
 
-def get_targets_geojson(run_id):
+def get_run_meta(run_id):
+    """Scalar run columns only; skips the AOI/params/progress JSONB blobs."""
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT id, ST_AsGeoJSON(geom), area_km2, mean_score, max_score, distance_to_road_m,
-                       distance_to_river_m, evidence_summary
-                FROM targets WHERE run_id = %s
-                ORDER BY mean_score DESC, area_km2 DESC
+                SELECT id, created_at, status, mode, aoi_name,
+                       overlay_path, sentinel_preview_path, hillshade_path, report_path, error
+                FROM runs WHERE id = %s
                 """,
                 (run_id,),
             )
-            rows = cur.fetchall()
-    features = []
-    for r in rows:
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": json.loads(r[1]),
-                "properties": {
-                    "id": str(r[0]),
-                    "area_km2": r[2],
-                    "mean_score": r[3],
-                    "max_score": r[4],
-                    "distance_to_road_m": r[5],
-                    "distance_to_river_m": r[6],
-                    "evidence_summary": r[7] or [],
-                },
-            }
+            row = cur.fetchone()
+    if not row:
+        return None
+    return {
+        "id": str(row[0]),
+        "created_at": row[1].isoformat(),
+        "status": row[2],
+        "mode": row[3],
+        "aoi_name": row[4],
+        "overlay_path": row[5],
+        "sentinel_preview_path": row[6],
+        "hillshade_path": row[7],
+        "report_path": row[8],
+        "error": row[9],
+    }
+
+
+# FeatureCollection aggregate over a `targets` row set; shared by the endpoints that
+# hand Postgres-serialized GeoJSON straight to the client.
+_TARGETS_FEATURE_COLLECTION = """
+    jsonb_build_object(
+        'type', 'FeatureCollection',
+        'features', COALESCE(
+            jsonb_agg(
+                jsonb_build_object(
+                    'type', 'Feature',
+                    'geometry', ST_AsGeoJSON(geom)::jsonb,
+                    'properties', jsonb_build_object(
+                        'id', id,
+                        'area_km2', area_km2,
+                        'mean_score', mean_score,
+                        'max_score', max_score,
+                        'distance_to_road_m', distance_to_road_m,
+                        'distance_to_river_m', distance_to_river_m,
+                        'evidence_summary',
+                        COALESCE(NULLIF(evidence_summary, 'null'::jsonb), '[]'::jsonb)
+                    )
+                )
+                ORDER BY mean_score DESC, area_km2 DESC
+            ),
+            '[]'::jsonb
         )
-    return {"type": "FeatureCollection", "features": features}
+    )
+"""
+
+
+def get_targets_geojson(run_id):
+    """Return the run's targets as a GeoJSON FeatureCollection, serialized by Postgres."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {_TARGETS_FEATURE_COLLECTION}::text FROM targets WHERE run_id = %s",
+                (run_id,),
+            )
+            row = cur.fetchone()
+    return row[0]
+
+
+def get_run_with_targets(run_id):
+    """Return `{"run": ..., "targets": FeatureCollection}` as JSON text from one query."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT jsonb_build_object(
+                    'run', to_jsonb(r) - 'aoi_geom',
+                    'targets', (
+                        SELECT {_TARGETS_FEATURE_COLLECTION} FROM targets WHERE run_id = r.id
+                    )
+                )::text
+                FROM runs r WHERE r.id = %s
+                """,
+                (run_id,),
+            )
+            row = cur.fetchone()
+    if not row:
+        return None
+    return row[0]
 
 
 def get_target_detail(run_id, target_id):
@@ -245,7 +380,7 @@ def get_target_detail(run_id, target_id):
         return None
     return {
         "id": str(row[0]),
-        "geometry": json.loads(row[1]),
+        "geometry": orjson.loads(row[1]),
         "area_km2": row[2],
         "mean_score": row[3],
         "max_score": row[4],
@@ -5,15 +5,27 @@ from typing import Dict
 
 from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
-
-from .db import init_db, create_run, update_run, list_runs, get_run, get_targets_geojson, get_target_detail
+from fastapi.responses import FileResponse, ORJSONResponse, Response
+
+from .db import (
+    init_db,
+    create_run,
+    update_run,
+    advance_progress,
+    list_runs,
+    get_run,
+    get_run_meta,
+    get_run_with_targets,
+    get_targets_geojson,
+    get_target_detail,
+)
 from .schemas import RunCreate, RunResponse
-from .pipeline.utils import aoi_area_km2, aoi_bounds, safe_json_dump
+from .pipeline.overlay import image_media_type
+from .pipeline.utils import aoi_area_km2, aoi_bounds, aoi_geom, safe_json_dump
 from .settings import settings
 from .tasks import process_run
 
-app = FastAPI(title="REE Atlas India API", version="0.1.0")
+app = FastAPI(title="REE Atlas India API", version="0.1.0", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,18 +51,7 @@ def _progress_template():
 
 
 def _update_progress(run_id: str, step: str):
-    run = get_run(run_id)
-    if not run:
-        return
-    progress = run.get("progress") or _progress_template()
-    if "steps" not in progress:
-        progress["steps"] = _progress_template()["steps"]
-    for k in progress["steps"].keys():
-        if k == step:
-            progress["steps"][k] = "running"
-        elif progress["steps"][k] == "running":
-            progress["steps"][k] = "done"
-    update_run(run_id, progress=progress)
+    advance_progress(run_id, step, _progress_template()["steps"])
 
 
 def _normalize_aoi(aoi_geojson: Dict) -> Dict:
@@ -76,12 +77,13 @@ def startup_event():
 @app.post("/runs", response_model=RunResponse)
 def create_run_endpoint(run: RunCreate, background_tasks: BackgroundTasks):
     aoi = _normalize_aoi(run.aoi_geojson)
-    area_km2 = aoi_area_km2(aoi)
+    geom = aoi_geom(aoi)
+    area_km2 = aoi_area_km2(geom)
     if area_km2 > settings.max_aoi_km2:
         raise HTTPException(status_code=400, detail=f"AOI too large: {area_km2:.1f} km² > {settings.max_aoi_km2} km²")
 
     run_id = str(uuid.uuid4())
-    bbox = aoi_bounds(aoi)
+    bbox = aoi_bounds(geom)
     run_record = {
         "id": run_id,
         "status": "queued",
@@ -110,7 +112,12 @@ def list_runs_endpoint():
 
 
 @app.get("/runs/{run_id}")
-def get_run_endpoint(run_id: str):
+def get_run_endpoint(run_id: str, include_targets: bool = False):
+    if include_targets:
+        body = get_run_with_targets(run_id)
+        if body is None:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return Response(content=body, media_type="application/json")
     run = get_run(run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
@@ -119,7 +126,7 @@ def get_run_endpoint(run_id: str):
 
 @app.get("/runs/{run_id}/targets")
 def get_targets_endpoint(run_id: str):
-    return get_targets_geojson(run_id)
+    return Response(content=get_targets_geojson(run_id), media_type="application/geo+json")
 
 
 @app.get("/runs/{run_id}/targets/{target_id}")
@@ -132,22 +139,27 @@ def get_target_detail_endpoint(run_id: str, target_id: str):
 
 @app.get("/runs/{run_id}/overlay.png")
 def overlay_endpoint(run_id: str):
-    run = get_run(run_id)
+    run = get_run_meta(run_id)
     if not run or not run.get("overlay_path"):
         raise HTTPException(status_code=404, detail="Overlay not found")
     return FileResponse(run["overlay_path"], media_type="image/png")
 
-@app.get("/runs/{run_id}/sentinel.png")
+
+# The preview is stored as WebP (older runs: PNG); the extension-free route serves either with
+# its real media type. sentinel.png stays as a compatibility alias for existing clients.
+@app.get("/runs/{run_id}/sentinel")
+@app.get("/runs/{run_id}/sentinel.png", deprecated=True)
 def sentinel_endpoint(run_id: str):
-    run = get_run(run_id)
+    run = get_run_meta(run_id)
     if not run or not run.get("sentinel_preview_path"):
         raise HTTPException(status_code=404, detail="Sentinel preview not found")
-    return FileResponse(run["sentinel_preview_path"], media_type="image/png")
+    path = run["sentinel_preview_path"]
+    return FileResponse(path, media_type=image_media_type(path))
 
 
 @app.get("/runs/{run_id}/hillshade.png")
 def hillshade_endpoint(run_id: str):
-    run = get_run(run_id)
+    run = get_run_meta(run_id)
     if not run or not run.get("hillshade_path"):
         raise HTTPException(status_code=404, detail="Hillshade not found")
     return FileResponse(run["hillshade_path"], media_type="image/png")
@@ -155,10 +167,14 @@ def hillshade_endpoint(run_id: str):
 
 @app.get("/runs/{run_id}/report.html")
 def report_endpoint(run_id: str):
-    run = get_run(run_id)
+    run = get_run_meta(run_id)
     if not run or not run.get("report_path"):
         raise HTTPException(status_code=404, detail="Report not found")
-    return HTMLResponse(open(run["report_path"], "r", encoding="utf-8").read())
+    return FileResponse(
+        run["report_path"],
+        media_type="text/html; charset=utf-8",
+        headers={"Cache-Control": "public, max-age=300"},
+    )
 
 
 @app.get("/runs/{run_id}/exports/targets.geojson")
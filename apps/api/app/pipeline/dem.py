@@ -3,23 +3,40 @@ import rioxarray as rxr
 from rasterio.enums import Resampling
 
 
-def compute_slope(dem_da):
+def terrain_gradient(dem_da):
     # dem_da in meters, assume projected CRS
     xres, yres = dem_da.rio.resolution()
     dzdx, dzdy = np.gradient(dem_da.values.astype("float32"), xres, yres)
-    slope = np.degrees(np.arctan(np.sqrt(dzdx**2 + dzdy**2)))
+    return dzdx, dzdy
+
+
+def compute_slope(dem_da, gradient=None):
+    dzdx, dzdy = gradient if gradient is not None else terrain_gradient(dem_da)
+    # single buffer, updated in place: hypot -> arctan -> degrees
+    slope = np.hypot(dzdx, dzdy)
+    np.arctan(slope, out=slope)
+    np.degrees(slope, out=slope)
     return dem_da.copy(data=slope)
 
 
-def compute_hillshade(dem_da, azimuth=315, altitude=45):
+def compute_hillshade(dem_da, azimuth=315, altitude=45, gradient=None):
     az = np.radians(azimuth)
     alt = np.radians(altitude)
-    xres, yres = dem_da.rio.resolution()
-    dzdx, dzdy = np.gradient(dem_da.values.astype("float32"), xres, yres)
-    slope = np.pi / 2.0 - np.arctan(np.sqrt(dzdx**2 + dzdy**2))
-    aspect = np.arctan2(-dzdx, dzdy)
-    shaded = np.sin(alt) * np.sin(slope) + np.cos(alt) * np.cos(slope) * np.cos(az - aspect)
-    shaded = np.clip(shaded, 0, 1)
+    dzdx, dzdy = gradient if gradient is not None else terrain_gradient(dem_da)
+    slope = np.hypot(dzdx, dzdy)
+    np.arctan(slope, out=slope)
+    np.subtract(np.pi / 2.0, slope, out=slope)
+    # arctan2(-dzdx, dzdy) == -arctan2(dzdx, dzdy), so az - aspect == az + arctan2(dzdx, dzdy)
+    aspect = np.arctan2(dzdx, dzdy)
+    np.add(aspect, az, out=aspect)
+    np.cos(aspect, out=aspect)
+    shaded = np.cos(slope)
+    shaded *= np.cos(alt)
+    shaded *= aspect
+    np.sin(slope, out=slope)
+    slope *= np.sin(alt)
+    shaded += slope
+    np.clip(shaded, 0, 1, out=shaded)
     return dem_da.copy(data=shaded)
 
 
@@ -1,29 +1,54 @@
-from typing import Tuple
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Tuple
 
+import cv2
 import numpy as np
 import rioxarray as rxr
+import shapely
 import xarray as xr
 from rasterio.features import rasterize
-from scipy.ndimage import distance_transform_edt
 from shapely.geometry import shape
 
 from .utils import normalize_minmax
 
+# Edge/skeleton extraction runs on overlapping tiles of this size. The overlap is wider than
+# the canny Gaussian support (sigma=2) plus its border erosion, so tile seams do not show.
+LINEAMENT_TILE = 1024
+LINEAMENT_OVERLAP = 32
+
 
 def compute_indices(s2_da: xr.DataArray) -> Tuple[xr.DataArray, xr.DataArray, xr.DataArray]:
     band_map = {b: i for i, b in enumerate(s2_da.band.values)}
-    blue = s2_da.isel(band=band_map["B2"]).astype("float32")
-    green = s2_da.isel(band=band_map["B3"]).astype("float32")
-    red = s2_da.isel(band=band_map["B4"]).astype("float32")
-    nir = s2_da.isel(band=band_map["B8"]).astype("float32")
-    swir = s2_da.isel(band=band_map["B11"]).astype("float32")
+    data = s2_da.values.astype("float32", copy=False)
+    blue = data[band_map["B2"]]
+    green = data[band_map["B3"]]
+    red = data[band_map["B4"]]
+    nir = data[band_map["B8"]]
+    swir = data[band_map["B11"]]
 
+    # Each index is built in its own output buffer; `tmp` holds the denominators.
     with np.errstate(divide="ignore", invalid="ignore"):
-        ndvi = (nir - red) / (nir + red)
-        ndwi = (green - nir) / (green + nir)
-        bsi = ((swir + red) - (nir + blue)) / ((swir + red) + (nir + blue))
+        tmp = np.add(nir, red)
+        ndvi = np.subtract(nir, red)
+        np.divide(ndvi, tmp, out=ndvi)
+
+        np.add(green, nir, out=tmp)
+        ndwi = np.subtract(green, nir)
+        np.divide(ndwi, tmp, out=ndwi)
+
+        np.add(swir, red, out=tmp)
+        den = np.add(nir, blue)
+        bsi = np.subtract(tmp, den)
+        np.add(tmp, den, out=den)
+        np.divide(bsi, den, out=bsi)
 
-    return ndvi, ndwi, bsi
+    ref = s2_da.isel(band=0, drop=True)
+
+    def _wrap(arr):
+        return xr.DataArray(arr, coords=ref.coords, dims=ref.dims)
+
+    return _wrap(ndvi), _wrap(ndwi), _wrap(bsi)
 
 
 def distance_raster(lines_gdf, ref_da: xr.DataArray) -> xr.DataArray:
@@ -37,36 +62,61 @@ def distance_raster(lines_gdf, ref_da: xr.DataArray) -> xr.DataArray:
         data = np.full(shape_hw, 1e6, dtype="float32")
         return ref_da.copy(data=data)
 
-    gdf_proj = lines_gdf.to_crs(crs)
-    shapes = [(geom, 1) for geom in gdf_proj.geometry if geom is not None and not geom.is_empty]
-    if not shapes:
+    # Pull the projected geometries out once and filter them with shapely's vectorized
+    # predicates rather than iterating the GeoSeries row by row.
+    geoms = np.asarray(lines_gdf.to_crs(crs).geometry.values)
+    geoms = geoms[~(shapely.is_missing(geoms) | shapely.is_empty(geoms))]
+    if geoms.size == 0:
         data = np.full(shape_hw, 1e6, dtype="float32")
         return ref_da.copy(data=data)
 
     raster = rasterize(
-        shapes,
+        geoms,
         out_shape=shape_hw,
         transform=transform,
         fill=0,
+        default_value=1,
         dtype="uint8",
     )
-    # distance in pixels
-    dist_px = distance_transform_edt(1 - raster)
+    # distance in pixels to the nearest line pixel (exact Euclidean with DIST_MASK_PRECISE)
+    dist_px = cv2.distanceTransform(1 - raster, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
     xres, yres = ref_da.rio.resolution()
     dist_m = dist_px * float(abs(xres))
     return ref_da.copy(data=dist_m)
 
 
+def _map_tiles(fn: Callable[[np.ndarray], np.ndarray], img: np.ndarray, tile: int, overlap: int,
+               dtype=bool) -> np.ndarray:
+    h, w = img.shape
+    if h <= tile and w <= tile:
+        return fn(img).astype(dtype, copy=False)
+
+    out = np.empty(img.shape, dtype=dtype)
+
+    def _run(origin):
+        r, c = origin
+        r0, c0 = max(r - overlap, 0), max(c - overlap, 0)
+        res = fn(img[r0:min(r + tile + overlap, h), c0:min(c + tile + overlap, w)])
+        out[r:r + tile, c:c + tile] = res[r - r0:r - r0 + tile, c - c0:c - c0 + tile]
+
+    origins = [(r, c) for r in range(0, h, tile) for c in range(0, w, tile)]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        list(ex.map(_run, origins))
+    return out
+
+
 def lineament_density(hillshade_da: xr.DataArray) -> xr.DataArray:
     from skimage.feature import canny
     from skimage.morphology import skeletonize
-    from scipy.ndimage import uniform_filter
 
     img = hillshade_da.values.astype("float32")
     # Normalize
     img = normalize_minmax(img)
-    edges = canny(img, sigma=2)
-    skel = skeletonize(edges).astype("float32")
-    density = uniform_filter(skel, size=15)
+    skel = _map_tiles(
+        lambda t: skeletonize(canny(t, sigma=2)), img, LINEAMENT_TILE, LINEAMENT_OVERLAP
+    )
+    skel = skel.astype("float32")
+    # 15x15 mean; BORDER_REFLECT matches scipy uniform_filter's default "reflect" mode
+    density = cv2.boxFilter(skel, ddepth=-1, ksize=(15, 15), borderType=cv2.BORDER_REFLECT)
     density = normalize_minmax(density)
     return hillshade_da.copy(data=density)
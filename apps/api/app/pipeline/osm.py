@@ -1,19 +1,74 @@
-import json
-from typing import Dict, Tuple
+import gzip
+import os
+import tempfile
+from typing import Dict, Optional, Tuple
 
 import geopandas as gpd
+import numpy as np
+import orjson
 import requests
-from shapely.geometry import LineString
+import shapely
+
+from .utils import ensure_dir, hash_str
 
 OVERPASS_URL = "https://overpass-api.de/api/interpreter"
 
+ROAD, RIVER, COAST = 0, 1, 2
+
 
 def _bbox_str(bounds: Tuple[float, float, float, float]) -> str:
     minx, miny, maxx, maxy = bounds
     return f"{miny},{minx},{maxy},{maxx}"
 
 
-def fetch_osm_lines(bounds: Tuple[float, float, float, float], timeout_s: int = 60):
+def _cache_path(bounds: Tuple[float, float, float, float], cache_dir: str) -> str:
+    # ~100 m rounding so near-identical AOIs share one cached response
+    key = hash_str(",".join(f"{round(v, 3)}" for v in bounds))
+    return os.path.join(ensure_dir(os.path.join(cache_dir, "osm")), f"{key}.json.gz")
+
+
+def _read_cache(path: str) -> Optional[Dict]:
+    # a truncated or corrupt entry is a miss, and the fetch below overwrites it
+    try:
+        with gzip.open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, EOFError, orjson.JSONDecodeError):
+        return None
+
+
+def _write_cache(path: str, content: bytes):
+    # Written under a unique temp name and renamed into place, so readers never see a partial
+    # file. Caching is best effort: an I/O error must not discard a response already fetched.
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+
+
+def _overpass_query(query: str, bounds: Tuple[float, float, float, float], timeout_s: int,
+                    cache_dir: Optional[str], cache_enabled: bool) -> Dict:
+    path = _cache_path(bounds, cache_dir) if cache_dir and cache_enabled else None
+    if path and os.path.exists(path):
+        data = _read_cache(path)
+        if data is not None:
+            return data
+    resp = requests.post(OVERPASS_URL, data={"data": query}, timeout=timeout_s)
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+    if path:
+        _write_cache(path, resp.content)
+    return data
+
+
+def fetch_osm_lines(bounds: Tuple[float, float, float, float], timeout_s: int = 60,
+                    cache_dir: Optional[str] = None, cache_enabled: bool = False):
     bbox = _bbox_str(bounds)
     query = f"""
     [out:json][timeout:90];
@@ -25,9 +80,7 @@ def fetch_osm_lines(bounds: Tuple[float, float, float, float], timeout_s: int =
     out geom;
     """
     try:
-        resp = requests.post(OVERPASS_URL, data={"data": query}, timeout=timeout_s)
-        resp.raise_for_status()
-        data = resp.json()
+        data = _overpass_query(query, bounds, timeout_s, cache_dir, cache_enabled)
     except Exception:
         return (
             gpd.GeoDataFrame(geometry=[], crs="EPSG:4326"),
@@ -35,27 +88,44 @@ def fetch_osm_lines(bounds: Tuple[float, float, float, float], timeout_s: int =
             gpd.GeoDataFrame(geometry=[], crs="EPSG:4326"),
         )
 
-    roads = []
-    rivers = []
-    coast = []
+    # Gather every way's coordinates into flat arrays and build all lines in one
+    # vectorized shapely call instead of a LineString per way.
+    kind_by_way = []
+    counts = []
+    lons = []
+    lats = []
     for el in data.get("elements", []):
         if el.get("type") != "way":
             continue
         coords = el.get("geometry")
-        if not coords:
+        if not coords or len(coords) < 2:
             continue
-        line = LineString([(c["lon"], c["lat"]) for c in coords])
         tags = el.get("tags", {})
         if "highway" in tags:
-            roads.append(line)
+            kind = ROAD
         elif tags.get("waterway") in ["river", "stream"]:
-            rivers.append(line)
+            kind = RIVER
         elif tags.get("natural") == "coastline":
-            coast.append(line)
+            kind = COAST
+        else:
+            continue
+        kind_by_way.append(kind)
+        counts.append(len(coords))
+        lons.extend(c["lon"] for c in coords)
+        lats.extend(c["lat"] for c in coords)
+
+    if counts:
+        lines = shapely.linestrings(
+            np.column_stack([lons, lats]),
+            indices=np.repeat(np.arange(len(counts)), counts),
+        )
+    else:
+        lines = np.empty(0, dtype=object)
+    kind_by_way = np.asarray(kind_by_way, dtype=np.uint8)
 
-    roads_gdf = gpd.GeoDataFrame(geometry=roads, crs="EPSG:4326")
-    rivers_gdf = gpd.GeoDataFrame(geometry=rivers, crs="EPSG:4326")
-    coast_gdf = gpd.GeoDataFrame(geometry=coast, crs="EPSG:4326")
+    roads_gdf = gpd.GeoDataFrame(geometry=lines[kind_by_way == ROAD], crs="EPSG:4326")
+    rivers_gdf = gpd.GeoDataFrame(geometry=lines[kind_by_way == RIVER], crs="EPSG:4326")
+    coast_gdf = gpd.GeoDataFrame(geometry=lines[kind_by_way == COAST], crs="EPSG:4326")
     return roads_gdf, rivers_gdf, coast_gdf
 
 
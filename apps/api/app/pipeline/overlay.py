@@ -23,33 +23,40 @@ def raster_bounds_latlon(da) -> Dict:
 
 
 def save_score_overlay(score_da, path: str) -> Dict:
-    score = score_da.values.astype("float32")
-    score = np.clip(score, 0, 1)
-    gray = (score * 255).astype(np.uint8)
-    alpha = (score * 255).astype(np.uint8)
-    rgba = np.stack([gray, gray, gray, alpha], axis=-1)
+    score = np.clip(score_da.values.astype("float32"), 0, 1)
+    score *= 255
+    # gray and alpha are the same ramp: fill all four channels from one uint8 plane
+    rgba = np.empty(score.shape + (4,), dtype=np.uint8)
+    rgba[...] = score.astype(np.uint8)[..., None]
     img = Image.fromarray(rgba, mode="RGBA")
-    img.save(path)
+    img.save(path, compress_level=1)
     return raster_bounds_latlon(score_da)
 
 
 def save_rgb_preview(r_da, g_da, b_da, path: str) -> Dict:
-    r = scale_to_uint8(r_da.values)
-    g = scale_to_uint8(g_da.values)
-    b = scale_to_uint8(b_da.values)
-    rgb = np.stack([r, g, b], axis=-1)
+    rgb = np.empty(r_da.shape[-2:] + (3,), dtype=np.uint8)
+    rgb[..., 0] = scale_to_uint8(r_da.data)
+    rgb[..., 1] = scale_to_uint8(g_da.data)
+    rgb[..., 2] = scale_to_uint8(b_da.data)
     img = Image.fromarray(rgb, mode="RGB")
-    img.save(path)
+    if path.endswith(".webp"):
+        img.save(path, "WEBP", quality=85, method=4)
+    else:
+        img.save(path, compress_level=1)
     return raster_bounds_latlon(r_da)
 
 
 def save_hillshade(hillshade_da, path: str) -> Dict:
     gray = (np.clip(hillshade_da.values, 0, 1) * 255).astype(np.uint8)
     img = Image.fromarray(gray, mode="L")
-    img.save(path)
+    img.save(path, compress_level=1)
     return raster_bounds_latlon(hillshade_da)
 
 
+def image_media_type(path: str) -> str:
+    return "image/webp" if path.endswith(".webp") else "image/png"
+
+
 def image_to_base64(path: str) -> str:
     with open(path, "rb") as f:
         encoded = base64.b64encode(f.read()).decode("utf-8")
@@ -3,30 +3,38 @@ from typing import Dict, List
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-from .overlay import image_to_base64
+# Built once per process: the template is compiled on first load and never re-checked.
+_ENV = Environment(
+    loader=FileSystemLoader(str(Path(__file__).parent.parent / "templates")),
+    autoescape=select_autoescape(["html", "xml"]),
+    auto_reload=False,
+    cache_size=64,
+)
+_TEMPLATE = _ENV.get_template("report.html")
 
+# Image endpoints relative to /runs/{run_id}/report.html
+IMAGE_URLS = {
+    "overlay": "overlay.png",
+    "sentinel": "sentinel",
+    "hillshade": "hillshade.png",
+}
 
-def render_report(run_dir: str, run_meta: Dict, targets: List[Dict]) -> str:
-    env = Environment(
-        loader=FileSystemLoader(str(Path(__file__).parent.parent / "templates")),
-        autoescape=select_autoescape(["html", "xml"]),
-    )
-    template = env.get_template("report.html")
 
+def _image_src(path: str, url: str) -> str:
+    return url if path else ""
+
+
+def render_report(run_dir: str, run_meta: Dict, targets: List[Dict]) -> str:
     overlay_path = run_meta.get("overlay_path")
     sentinel_path = run_meta.get("sentinel_preview_path")
     hillshade_path = run_meta.get("hillshade_path")
 
-    overlay_b64 = image_to_base64(overlay_path) if overlay_path else ""
-    sentinel_b64 = image_to_base64(sentinel_path) if sentinel_path else ""
-    hillshade_b64 = image_to_base64(hillshade_path) if hillshade_path else ""
-
-    html = template.render(
+    html = _TEMPLATE.render(
         run=run_meta,
         targets=targets,
-        overlay_b64=overlay_b64,
-        sentinel_b64=sentinel_b64,
-        hillshade_b64=hillshade_b64,
+        overlay_src=_image_src(overlay_path, IMAGE_URLS["overlay"]),
+        sentinel_src=_image_src(sentinel_path, IMAGE_URLS["sentinel"]),
+        hillshade_src=_image_src(hillshade_path, IMAGE_URLS["hillshade"]),
     )
 
     report_path = str(Path(run_dir) / "report.html")
@@ -1,5 +1,6 @@
-import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Optional
@@ -13,14 +14,14 @@ from rasterio.transform import from_bounds
 from shapely.geometry import mapping
 
 from .stac import load_sentinel_composite, load_dem
-from .dem import compute_slope, compute_hillshade, reproject_to_match
+from .dem import compute_slope, compute_hillshade, reproject_to_match, terrain_gradient
 from .osm import fetch_osm_lines, save_geojson
 from .features import compute_indices, distance_raster, lineament_density
 from .scoring import coastal_score, hardrock_score
 from .targets import extract_targets
 from .overlay import save_score_overlay, save_rgb_preview, save_hillshade
 from .report import render_report
-from .utils import ensure_dir, aoi_bounds, aoi_area_km2, utm_crs_from_lonlat, safe_json_dump
+from .utils import ensure_dir, aoi_bounds, aoi_area_km2, aoi_geom, safe_json_dump, nan_quantiles
 from ..settings import settings
 
 
@@ -31,31 +32,52 @@ def _default_time_range():
 
 
 def _save_da(da: xr.DataArray, path: str):
-    da.rio.to_raster(path)
+    # Tiled ZSTD; the floating-point predictor for float rasters, horizontal differencing otherwise
+    da.rio.to_raster(
+        path,
+        tiled=True,
+        blockxsize=512,
+        blockysize=512,
+        compress="ZSTD",
+        zstd_level=3,
+        predictor=3 if np.issubdtype(da.dtype, np.floating) else 2,
+        BIGTIFF="IF_SAFER",
+        num_threads="ALL_CPUS",
+    )
+
+
+def _evidence_dataset(layers: Dict[str, xr.DataArray]) -> xr.Dataset:
+    # Every layer is already on the imagery grid: override takes the first layer's coords
+    # instead of aligning (and possibly copying) each one against the others.
+    return xr.merge([da.rename(name) for name, da in layers.items()],
+                    compat="override", join="override", combine_attrs="override")
 
 
-def _synthetic_sentinel(aoi_geojson: Dict, width: int = 256, height: int = 256) -> xr.DataArray:
-    minx, miny, maxx, maxy = aoi_bounds(aoi_geojson)
+def _synthetic_sentinel(aoi, width: int = 256, height: int = 256) -> xr.DataArray:
+    minx, miny, maxx, maxy = aoi_bounds(aoi)
     transform = from_bounds(minx, miny, maxx, maxy, width, height)
     x = np.linspace(minx, maxx, width)
     y = np.linspace(maxy, miny, height)
     xv, yv = np.meshgrid(x, y)
-    base = (np.sin(xv * 10) + np.cos(yv * 10)) * 0.5 + 0.5
-    noise = np.random.default_rng(42).normal(scale=0.05, size=base.shape)
-    def band(scale, bias):
-        return np.clip(base * scale + bias + noise, 0, 1).astype("float32")
-
-    bands = {
-        "B2": band(0.6, 0.1),
-        "B3": band(0.7, 0.1),
-        "B4": band(0.8, 0.05),
-        "B8": band(0.9, 0.02),
-        "B11": band(0.7, 0.08),
-    }
+    base = (np.sin(xv * 10) + np.cos(yv * 10)).astype("float32")
+    base *= 0.5
+    base += 0.5
+    noise = np.random.default_rng(42).normal(scale=0.05, size=base.shape).astype("float32")
+
+    band_names = ["B2", "B3", "B4", "B8", "B11"]
+    scales = np.array([0.6, 0.7, 0.8, 0.9, 0.7], dtype="float32")
+    biases = np.array([0.1, 0.1, 0.05, 0.02, 0.08], dtype="float32")
+    # all five bands in one broadcast into a preallocated (band, y, x) buffer
+    bands = np.empty((len(band_names), height, width), dtype="float32")
+    np.multiply(base[None], scales[:, None, None], out=bands)
+    bands += biases[:, None, None]
+    bands += noise
+    np.clip(bands, 0, 1, out=bands)
+
     da = xr.DataArray(
-        np.stack([bands[k] for k in bands.keys()], axis=0),
+        bands,
         dims=("band", "y", "x"),
-        coords={"band": list(bands.keys()), "y": y, "x": x},
+        coords={"band": band_names, "y": y, "x": x},
     )
     da.rio.write_transform(transform, inplace=True)
     da.rio.write_crs("EPSG:4326", inplace=True)
@@ -70,28 +92,32 @@ def _synthetic_dem(ref_da: xr.DataArray) -> xr.DataArray:
     return ref_da.isel(band=0).copy(data=dem.astype("float32"))
 
 
+_GEOLOGY_KEYWORDS = [
+    "carbonatite",
+    "alkaline",
+    "syenite",
+    "ijolite",
+    "nepheline",
+    "granite pegmatite",
+    "ree",
+    "monazite",
+    "bastnaesite",
+]
+# one scan per feature instead of one per keyword
+_GEOLOGY_RE = re.compile("|".join(map(re.escape, _GEOLOGY_KEYWORDS)), re.IGNORECASE)
+
+
 def _rasterize_geology(geology_geojson: Dict, ref_da: xr.DataArray) -> Optional[xr.DataArray]:
     if not geology_geojson:
         return None
-    keywords = [
-        "carbonatite",
-        "alkaline",
-        "syenite",
-        "ijolite",
-        "nepheline",
-        "granite pegmatite",
-        "ree",
-        "monazite",
-        "bastnaesite",
-    ]
     import geopandas as gpd
     from shapely.geometry import shape
 
     records = []
     for feat in geology_geojson.get("features", []):
         props = feat.get("properties", {})
-        text = " ".join([str(v) for v in props.values()]).lower()
-        if any(k in text for k in keywords):
+        text = " ".join([str(v) for v in props.values()])
+        if _GEOLOGY_RE.search(text):
             geom = feat.get("geometry")
             if geom:
                 records.append({"geometry": shape(geom)})
@@ -112,7 +138,7 @@ def _rasterize_geology(geology_geojson: Dict, ref_da: xr.DataArray) -> Optional[
         fill=0,
         dtype="uint8",
     )
-    return ref_da.copy(data=mask.astype("float32"))
+    return ref_da.copy(data=mask)
 
 
 def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geology_geojson: Optional[Dict] = None,
@@ -130,8 +156,26 @@ def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geolog
 
     cache_enabled = bool(params.get("cache_downloads", False))
     use_synth = bool(params.get("use_synthetic", False))
+
+    # OSM and DEM fetches are network-bound; start them first so they overlap with the
+    # imagery fetch and the index work.
+    # shutdown(wait=False) only stops new submissions; both fetches still run to completion.
+    aoi_shape = aoi_geom(aoi_geojson)
+    bounds = aoi_bounds(aoi_shape)
+    osm_timeout = int(params.get("osm_timeout_s", 40))
+    fetch_pool = ThreadPoolExecutor(max_workers=2)
+    osm_future = fetch_pool.submit(fetch_osm_lines, bounds, timeout_s=osm_timeout,
+                                   cache_dir=cache_dir, cache_enabled=cache_enabled)
+    dem_future = None
+    if not use_synth:
+        dem_future = fetch_pool.submit(load_dem, settings.stac_api_url,
+                                       [c.strip() for c in settings.stac_collection_dem.split(",")],
+                                       aoi_geojson, cache_dir=cache_dir,
+                                       cache_enabled=cache_enabled)
+    fetch_pool.shutdown(wait=False)
+
     if use_synth:
-        s2_da = _synthetic_sentinel(aoi_geojson, width=int(params.get("synthetic_width", 256)),
+        s2_da = _synthetic_sentinel(aoi_shape, width=int(params.get("synthetic_width", 256)),
                                     height=int(params.get("synthetic_height", 256)))
     else:
         s2_da, bands = load_sentinel_composite(
@@ -160,8 +204,7 @@ def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geolog
         if use_synth:
             dem_da = _synthetic_dem(s2_da)
         else:
-            dem_da = load_dem(settings.stac_api_url, [c.strip() for c in settings.stac_collection_dem.split(",")],
-                             aoi_geojson, cache_dir=cache_dir, cache_enabled=cache_enabled)
+            dem_da = dem_future.result()
     except Exception:
         # fallback flat DEM if not available
         dem_da = s2_da.isel(band=0).copy(data=np.zeros_like(s2_da.isel(band=0).values))
@@ -169,24 +212,27 @@ def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geolog
     dem_da = reproject_to_match(dem_da, s2_da.isel(band=0))
     _save_da(dem_da, os.path.join(run_dir, "dem.tif"))
 
-    slope = compute_slope(dem_da)
-    hillshade = compute_hillshade(dem_da)
+    gradient = terrain_gradient(dem_da)
+    slope = compute_slope(dem_da, gradient=gradient)
+    hillshade = compute_hillshade(dem_da, gradient=gradient)
+    del gradient
     _save_da(slope, os.path.join(run_dir, "slope.tif"))
     _save_da(hillshade, os.path.join(run_dir, "hillshade.tif"))
 
     if progress_cb:
         progress_cb("fetch_osm")
 
-    bounds = aoi_bounds(aoi_geojson)
-    osm_timeout = int(params.get("osm_timeout_s", 40))
-    roads, rivers, coast = fetch_osm_lines(bounds, timeout_s=osm_timeout)
+    roads, rivers, coast = osm_future.result()
     save_geojson(roads, os.path.join(run_dir, "roads.geojson"))
     save_geojson(rivers, os.path.join(run_dir, "rivers.geojson"))
     save_geojson(coast, os.path.join(run_dir, "coast.geojson"))
 
-    dist_roads = distance_raster(roads, s2_da.isel(band=0))
-    dist_rivers = distance_raster(rivers, s2_da.isel(band=0))
-    dist_coast = distance_raster(coast, s2_da.isel(band=0))
+    # rasterize and the OpenCV distance transform both release the GIL, so the three layers overlap
+    ref_band = s2_da.isel(band=0)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        dist_roads, dist_rivers, dist_coast = pool.map(
+            distance_raster, (roads, rivers, coast), (ref_band,) * 3
+        )
     _save_da(dist_roads, os.path.join(run_dir, "dist_roads.tif"))
     _save_da(dist_rivers, os.path.join(run_dir, "dist_rivers.tif"))
     _save_da(dist_coast, os.path.join(run_dir, "dist_coast.tif"))
@@ -208,29 +254,34 @@ def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geolog
     if mode == "coastal":
         score, score_meta = coastal_score(ndvi, ndwi, bsi, slope, dist_coast, dist_rivers, params)
         thresholds = score_meta["meta"]["thresholds"].copy()
-        thresholds["bsi_threshold_value"] = float(np.nanpercentile(bsi.values, thresholds["bsi_percentile"]))
+        thresholds["bsi_threshold_value"] = float(
+            nan_quantiles(bsi.values, thresholds["bsi_percentile"] * 0.01)
+        )
         thresholds["coast_max_m"] = thresholds["coast_max_m"]
         thresholds["river_max_m"] = thresholds["river_max_m"]
-        evidence_layers = {
+        evidence_layers = _evidence_dataset({
             "ndvi": ndvi,
             "ndwi": ndwi,
             "bsi": bsi,
             "slope": slope,
             "dist_coast": dist_coast,
             "dist_river": dist_rivers,
-        }
+        })
     else:
         score, score_meta = hardrock_score(ndvi, ndwi, slope, lineaments, geology_mask, params)
         thresholds = score_meta["meta"]["thresholds"].copy()
-        thresholds["lineament_threshold_value"] = float(np.nanpercentile(lineaments.values, thresholds["lineament_percentile"]))
-        evidence_layers = {
+        thresholds["lineament_threshold_value"] = float(
+            nan_quantiles(lineaments.values, thresholds["lineament_percentile"] * 0.01)
+        )
+        layers = {
             "ndvi": ndvi,
             "ndwi": ndwi,
             "slope": slope,
             "lineaments": lineaments,
         }
         if geology_mask is not None:
-            evidence_layers["geology_mask"] = geology_mask
+            layers["geology_mask"] = geology_mask
+        evidence_layers = _evidence_dataset(layers)
 
     _save_da(score, os.path.join(run_dir, "score.tif"))
 
@@ -242,7 +293,7 @@ def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geolog
         threshold_value = float(params.get("fixed_threshold", 0.7))
     else:
         percentile = float(params.get("target_percentile", 95))
-        threshold_value = float(np.nanpercentile(score.values, percentile))
+        threshold_value = float(nan_quantiles(score.values, percentile * 0.01))
 
     min_area_km2 = float(params.get("min_area_km2", 0.1))
 
@@ -268,7 +319,7 @@ def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geolog
     r = s2_da.sel(band="B4")
     g = s2_da.sel(band="B3")
     b = s2_da.sel(band="B2")
-    sentinel_path = os.path.join(run_dir, "sentinel_preview.png")
+    sentinel_path = os.path.join(run_dir, "sentinel_preview.webp")
     save_rgb_preview(r, g, b, sentinel_path)
 
     hillshade_path = os.path.join(run_dir, "dem_hillshade.png")
@@ -280,7 +331,7 @@ def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geolog
         "features": [
             {
                 "type": "Feature",
-                "geometry": json.loads(json.dumps(mapping(t["geometry"]))),
+                "geometry": mapping(t["geometry"]),
                 "properties": {
                     "id": t["id"],
                     "area_km2": t["area_km2"],
@@ -296,23 +347,21 @@ def run_pipeline(run_id: str, aoi_geojson: Dict, mode: str, params: Dict, geolog
     }
     safe_json_dump(targets_geojson, os.path.join(run_dir, "targets.geojson"))
 
+    # column-wise: one list per field rather than a dict per row for pandas to re-pivot
     df = pd.DataFrame(
-        [
-            {
-                "id": t["id"],
-                "centroid_lat": t["centroid"].y,
-                "centroid_lon": t["centroid"].x,
-                "area_km2": t["area_km2"],
-                "mean_score": t["mean_score"],
-                "max_score": t["max_score"],
-                "distance_to_road_m": t["distance_to_road_m"],
-                "distance_to_river_m": t["distance_to_river_m"],
-                "evidence_summary": ";".join(t["evidence_summary"] or []),
-            }
-            for t in targets
-        ]
+        {
+            "id": [t["id"] for t in targets],
+            "centroid_lat": [t["centroid"].y for t in targets],
+            "centroid_lon": [t["centroid"].x for t in targets],
+            "area_km2": [t["area_km2"] for t in targets],
+            "mean_score": [t["mean_score"] for t in targets],
+            "max_score": [t["max_score"] for t in targets],
+            "distance_to_road_m": [t["distance_to_road_m"] for t in targets],
+            "distance_to_river_m": [t["distance_to_river_m"] for t in targets],
+            "evidence_summary": [";".join(t["evidence_summary"] or []) for t in targets],
+        }
     )
-    df.to_csv(os.path.join(run_dir, "targets.csv"), index=False)
+    df.to_csv(os.path.join(run_dir, "targets.csv"), index=False, lineterminator="\n")
 
     report_path = render_report(
         run_dir,
@@ -2,11 +2,12 @@ from typing import Dict, Tuple
 import numpy as np
 import xarray as xr
 
+from .utils import nan_quantiles
+
 
 def _percentile_scale(arr: xr.DataArray, p_low: float, p_high: float) -> xr.DataArray:
     data = arr.values.astype("float32")
-    lo = np.nanpercentile(data, p_low)
-    hi = np.nanpercentile(data, p_high)
+    lo, hi = nan_quantiles(data, (p_low * 0.01, p_high * 0.01))
     if hi - lo == 0:
         scaled = np.zeros_like(data)
     else:
@@ -15,6 +16,15 @@ def _percentile_scale(arr: xr.DataArray, p_low: float, p_high: float) -> xr.Data
     return arr.copy(data=scaled)
 
 
+def _ramp_down(values: np.ndarray, max_val: float) -> np.ndarray:
+    # clip(1 - values / max_val, 0, 1) in a single float32 buffer
+    out = np.array(values, dtype="float32")
+    out /= max_val
+    np.subtract(1.0, out, out=out)
+    np.clip(out, 0, 1, out=out)
+    return out
+
+
 def coastal_score(
     ndvi: xr.DataArray,
     ndwi: xr.DataArray,
@@ -43,31 +53,38 @@ def coastal_score(
         },
     )
 
-    coastal_score = 1.0 - (dist_coast_m / thresholds["coast_max_m"])
-    coastal_score = coastal_score.clip(0, 1)
-
-    slope_score = 1.0 - (slope / thresholds["slope_max"])
-    slope_score = slope_score.clip(0, 1)
-
-    bare_land_score = 1.0 - (ndvi / thresholds["ndvi_max"])
-    bare_land_score = bare_land_score.clip(0, 1)
-
+    # Each component is computed in place in its own buffer, and the weighted sum is
+    # accumulated into `score` through one scratch buffer, instead of letting every
+    # xarray operator materialize a fresh raster.
+    coastal = _ramp_down(dist_coast_m.values, thresholds["coast_max_m"])
+    slope_s = _ramp_down(slope.values, thresholds["slope_max"])
+    bare_land = _ramp_down(ndvi.values, thresholds["ndvi_max"])
     sandiness_score = _percentile_scale(bsi, thresholds["bsi_percentile"], 98)
-
-    river_score = 1.0 - (dist_river_m / thresholds["river_max_m"])
-    river_score = river_score.clip(0, 1)
-
-    score = (
-        coastal_score * weights["coastal_proximity"]
-        + slope_score * weights["slope"]
-        + bare_land_score * weights["bare_land"]
-        + sandiness_score * weights["sandiness"]
-        + river_score * weights["river_proximity"]
-    )
-
-    water_mask = (ndwi < thresholds["ndwi_water_max"]).astype("float32")
-    score = score * water_mask
-    score = score.clip(0, 1)
+    river = _ramp_down(dist_river_m.values, thresholds["river_max_m"])
+
+    score = np.multiply(coastal, weights["coastal_proximity"])
+    tmp = np.empty_like(score)
+    for component, weight in (
+        (slope_s, weights["slope"]),
+        (bare_land, weights["bare_land"]),
+        (sandiness_score.values, weights["sandiness"]),
+        (river, weights["river_proximity"]),
+    ):
+        np.multiply(component, weight, out=tmp)
+        score += tmp
+    del tmp
+
+    water = (ndwi.values < thresholds["ndwi_water_max"]).view(np.uint8)
+    np.multiply(score, water, out=score, dtype="float32")
+    np.clip(score, 0, 1, out=score)
+
+    # each layer keeps the grid metadata of the input it was derived from
+    coastal_score = dist_coast_m.copy(data=coastal)
+    slope_score = slope.copy(data=slope_s)
+    bare_land_score = ndvi.copy(data=bare_land)
+    river_score = dist_river_m.copy(data=river)
+    water_mask = ndwi.copy(data=water)
+    score = dist_coast_m.copy(data=score)
 
     meta = {
         "mode": "coastal",
@@ -112,10 +129,14 @@ def hardrock_score(
 
     lineament_score = _percentile_scale(lineaments, thresholds["lineament_percentile"], 98)
 
-    relief_score = ((slope >= thresholds["slope_min"]) & (slope <= thresholds["slope_max"])).astype("float32")
+    # Binary layers stay uint8 (a quarter of the float32 traffic); dtype= keeps the
+    # arithmetic in float32 instead of numpy's float16 promotion for uint8 * float.
+    slope_v = slope.values
+    relief = (
+        (slope_v >= thresholds["slope_min"]) & (slope_v <= thresholds["slope_max"])
+    ).view(np.uint8)
 
-    exposure_score = 1.0 - (ndvi / thresholds["ndvi_max"])
-    exposure_score = exposure_score.clip(0, 1)
+    exposure = _ramp_down(ndvi.values, thresholds["ndvi_max"])
 
     geology_score = geology_mask if geology_mask is not None else None
 
@@ -131,13 +152,25 @@ def hardrock_score(
         w_exposure = weights["exposure"]
         w_geo = weights["geology_boost"]
 
-    score = lineament_score * w_line + relief_score * w_relief + exposure_score * w_exposure
+    score = np.multiply(lineament_score.values, w_line, dtype="float32")
+    tmp = np.empty_like(score)
+    np.multiply(relief, w_relief, out=tmp, dtype="float32")
+    score += tmp
+    np.multiply(exposure, w_exposure, out=tmp)
+    score += tmp
     if geology_score is not None:
-        score = score + geology_score * w_geo
-
-    water_mask = (ndwi < thresholds["ndwi_water_max"]).astype("float32")
-    score = score * water_mask
-    score = score.clip(0, 1)
+        np.multiply(geology_score.values, w_geo, out=tmp, dtype="float32")
+        score += tmp
+    del tmp
+
+    water = (ndwi.values < thresholds["ndwi_water_max"]).view(np.uint8)
+    np.multiply(score, water, out=score, dtype="float32")
+    np.clip(score, 0, 1, out=score)
+
+    relief_score = slope.copy(data=relief)
+    exposure_score = ndvi.copy(data=exposure)
+    water_mask = ndwi.copy(data=water)
+    score = lineament_score.copy(data=score)
 
     meta = {
         "mode": "hardrock",
@@ -1,7 +1,11 @@
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
+import orjson
+import rasterio
 import rioxarray as rxr
 import xarray as xr
 from pystac_client import Client
@@ -32,6 +36,16 @@ BAND_ALIASES = {
     "B11": ["B11", "B011", "B11"],
 }
 
+# Band reads are network-bound COG range requests; GDAL drops the GIL while waiting on CURL.
+READ_WORKERS = 8
+GDAL_HTTP_ENV = {
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "GDAL_HTTP_VERSION": "2",
+    "VSI_CACHE": "TRUE",
+    "GDAL_CACHEMAX": 512,
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+}
+
 
 def _sign_item(item, stac_api_url: str):
     if planetary_computer and "planetarycomputer" in stac_api_url:
@@ -91,19 +105,71 @@ def _get_asset(item, band: str):
     raise KeyError(band)
 
 
+def _band_cache_path(item, band: str, aoi_geojson: Dict, ref, cache_dir: str) -> str:
+    # Keyed on everything that shapes the clipped/reprojected output, so a hit can skip
+    # the asset open, the clip and the reprojection altogether.
+    aoi_key = hash_str(orjson.dumps(aoi_geojson, option=orjson.OPT_SORT_KEYS).decode())
+    ref_key = ""
+    if ref is not None:
+        ref_key = hash_str(f"{ref.rio.crs}{tuple(ref.rio.transform())}{ref.shape}")
+    key = hash_str(f"{item.id}|{band}|{aoi_key}|{ref_key}")
+    return os.path.join(ensure_dir(os.path.join(cache_dir, "bands")), f"{key}.tif")
+
+
+def _open_cog(href: str) -> xr.DataArray:
+    # Dask chunks match the COG's internal tiles, so each task reads whole blocks exactly once;
+    # lock=False lets the worker threads read different blocks concurrently.
+    with rasterio.open(href) as src:
+        block_y, block_x = src.block_shapes[0]
+    chunks = {"x": block_x, "y": block_y}
+    return rxr.open_rasterio(href, masked=True, chunks=chunks, lock=False).squeeze()
+
+
+def _clip_to_aoi(da: xr.DataArray, geom) -> xr.DataArray:
+    # Window to the AOI bbox first: on a lazily opened COG this selects only the overlapping
+    # blocks, so the polygon clip below never pulls the full asset.
+    da = da.rio.clip_box(*geom.bounds, crs="EPSG:4326")
+    return da.rio.clip([geom], crs="EPSG:4326", drop=True)
+
+
 def _read_band(item, band: str, aoi_geojson: Dict, ref=None, cache_dir: str = None,
                cache_enabled: bool = True) -> xr.DataArray:
+    cache_path = None
+    if cache_dir and cache_enabled:
+        cache_path = _band_cache_path(item, band, aoi_geojson, ref, cache_dir)
+        if os.path.exists(cache_path):
+            return rxr.open_rasterio(cache_path, masked=True).squeeze()
+
     asset = _get_asset(item, band)
     href = asset.href
     if cache_dir:
         href = _localize_asset(href, cache_dir, cache_enabled)
-    da = rxr.open_rasterio(href, masked=True).squeeze()
-    da = da.rio.clip([shape(aoi_geojson.get("geometry", aoi_geojson))], crs="EPSG:4326", drop=True)
+    da = _open_cog(href)
+    da = _clip_to_aoi(da, shape(aoi_geojson.get("geometry", aoi_geojson)))
     if ref is not None:
         da = da.rio.reproject_match(ref, resampling=Resampling.bilinear)
+    if cache_path:
+        # ZSTD with the floating-point predictor (byte-shuffles float32 like Blosc's SHUFFLE);
+        # written under a temp name so a partially written file is never picked up.
+        # mkstemp gives each writer its own name: concurrent runs share one process.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp.tif")
+        os.close(fd)
+        try:
+            da.rio.to_raster(tmp_path, driver="GTiff", tiled=True, compress="ZSTD", zstd_level=5,
+                             predictor=3 if np.issubdtype(da.dtype, np.floating) else 2)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
     return da
 
 
+def _read_band_in_env(*args, **kwargs) -> xr.DataArray:
+    # rasterio environments are per thread, so each worker enters its own
+    with rasterio.Env(**GDAL_HTTP_ENV):
+        return _read_band(*args, **kwargs)
+
+
 def load_sentinel_composite(
     stac_api_url: str,
     collection: str,
@@ -121,18 +187,31 @@ def load_sentinel_composite(
     signed_items = [_sign_item(it, stac_api_url) for it in items]
 
     # Reference grid from first item's B4 band
-    ref = _read_band(signed_items[0], "B4", aoi_geojson, cache_dir=cache_dir, cache_enabled=cache_enabled)
+    ref = _read_band_in_env(signed_items[0], "B4", aoi_geojson, cache_dir=cache_dir,
+                            cache_enabled=cache_enabled)
+
+    band_names = ["B2", "B3", "B4", "B8", "B11"]
+
+    def submit(pool, band):
+        return [
+            pool.submit(_read_band_in_env, item, band, aoi_geojson, ref=ref, cache_dir=cache_dir,
+                        cache_enabled=cache_enabled)
+            for item in signed_items
+        ]
 
+    # At most two bands are in flight: the next band's reads overlap the current band's median,
+    # and each band's time stack is released as soon as it is reduced.
     bands_out = []
-    band_names = []
-    for band in ["B2", "B3", "B4", "B8", "B11"]:
-        stack = []
-        for item in signed_items:
-            da = _read_band(item, band, aoi_geojson, ref=ref, cache_dir=cache_dir, cache_enabled=cache_enabled)
-            stack.append(da)
-        band_stack = xr.concat(stack, dim="time").median(dim="time", skipna=True)
-        bands_out.append(band_stack)
-        band_names.append(band)
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        pending = submit(pool, band_names[0])
+        for i in range(len(band_names)):
+            current = pending
+            pending = submit(pool, band_names[i + 1]) if i + 1 < len(band_names) else None
+            stack = [f.result() for f in current]
+            del current
+            # reproject_match already returns in-memory arrays, so the median runs eagerly
+            bands_out.append(xr.concat(stack, dim="time").median(dim="time", skipna=True))
+            del stack
 
     da = xr.concat(bands_out, dim="band")
     da = da.assign_coords(band=band_names)
@@ -165,8 +244,8 @@ def load_dem(
                     href = item.assets[key].href
                     if cache_dir:
                         href = _localize_asset(href, cache_dir, cache_enabled)
-                    da = rxr.open_rasterio(href, masked=True).squeeze()
-                    da = da.rio.clip([shape(geom)], crs="EPSG:4326", drop=True)
+                    da = _open_cog(href)
+                    da = _clip_to_aoi(da, shape(geom))
                     return da
         except Exception:
             continue
@@ -1,51 +1,52 @@
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union
 import uuid
 
 import numpy as np
+import shapely
 import xarray as xr
 from rasterio import features
-from shapely.geometry import shape, mapping
-from shapely.ops import transform as shp_transform
+from scipy import ndimage
+from shapely.geometry import shape
 import pyproj
 import geopandas as gpd
 
-
-def _geom_mask(geom, ref_da: xr.DataArray) -> np.ndarray:
-    return features.geometry_mask(
-        [mapping(geom)],
-        out_shape=(ref_da.shape[-2], ref_da.shape[-1]),
-        transform=ref_da.rio.transform(),
-        invert=True,
-    )
-
-
-def _area_km2(geom) -> float:
-    geod = pyproj.Geod(ellps="WGS84")
-    area, _ = geod.geometry_area_perimeter(geom)
-    return abs(area) / 1_000_000.0
+from .utils import crs_from_epsg, geodesic_area_km2, utm_epsg_from_lonlat
 
 
 def _centroid_wkt(geom) -> str:
     return geom.centroid.wkt
 
 
-def _distance_to_lines(geom, gdf: gpd.GeoDataFrame) -> float:
+def _line_tree(gdf: gpd.GeoDataFrame, metric_crs: pyproj.CRS):
     if gdf is None or gdf.empty:
         return None
-    # project to UTM for meters
-    centroid = geom.centroid
-    utm_crs = _utm_crs_from_lonlat(centroid.x, centroid.y)
-    project = pyproj.Transformer.from_crs("EPSG:4326", utm_crs, always_xy=True).transform
-    geom_proj = shp_transform(project, geom)
-    gdf_proj = gdf.to_crs(utm_crs)
-    union = gdf_proj.geometry.unary_union
-    return geom_proj.distance(union)
+    return shapely.STRtree(gdf.to_crs(metric_crs).geometry.to_numpy())
+
+
+def _project(geoms: np.ndarray, transformer: pyproj.Transformer) -> np.ndarray:
+    # one pyproj call over the coordinates of every geometry
+    return shapely.transform(
+        geoms, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1]))
+    )
+
+
+def _distance_to_lines(geoms_proj: np.ndarray, tree) -> List[float]:
+    if tree is None:
+        return [None] * len(geoms_proj)
+    # distance to the nearest line equals distance to the union of all lines
+    (src, _), dist = tree.query_nearest(geoms_proj, return_distance=True, all_matches=False)
+    # the tree skips missing/empty lines; with none left there is no match, as distance()
+    # to an empty union gives NaN
+    out = np.full(len(geoms_proj), np.nan)
+    out[src] = dist
+    return out.tolist()
 
 
-def _utm_crs_from_lonlat(lon, lat) -> str:
-    zone = int((lon + 180) / 6) + 1
-    hemisphere = "326" if lat >= 0 else "327"
-    return f"EPSG:{hemisphere}{zone:02d}"
+@lru_cache(maxsize=64)
+def _transformer(src_crs: pyproj.CRS, utm_epsg: int) -> pyproj.Transformer:
+    # PROJ setup dominates for small runs; AOIs rarely leave a handful of zones
+    return pyproj.Transformer.from_crs(src_crs, crs_from_epsg(utm_epsg), always_xy=True)
 
 
 def extract_targets(
@@ -53,7 +54,7 @@ def extract_targets(
     threshold: float,
     min_area_km2: float,
     mode: str,
-    evidence_layers: Dict[str, xr.DataArray],
+    evidence_layers: Union[xr.Dataset, Dict[str, xr.DataArray]],
     thresholds: Dict[str, float],
     roads_gdf: gpd.GeoDataFrame,
     rivers_gdf: gpd.GeoDataFrame,
@@ -75,29 +76,61 @@ def extract_targets(
         x0, y0 = transform * (0, 0)
         x1, y1 = transform * (1, 1)
         poly = Polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)])
-        pixel_area_km2 = _area_km2(poly)
+        pixel_area_km2 = geodesic_area_km2(poly)
     else:
         pixel_area_km2 = abs(xres * yres) / 1_000_000.0
     min_size_px = max(int(min_area_km2 / pixel_area_km2), 1)
     mask = remove_small_objects(mask, min_size=min_size_px)
 
-    shapes = features.shapes(mask.astype("uint8"), mask=mask, transform=score_da.rio.transform())
+    # Label once and reduce per region in C, rather than re-rasterizing every polygon.
+    # Both label() and shapes() use 4-connectivity, so each shape maps to exactly one label.
+    labels, _ = ndimage.label(mask)
+    transform = score_da.rio.transform()
 
-    targets = []
+    shapes = features.shapes(labels, mask=mask, transform=transform)
+
+    region_labels = []
+    polys = []
     for geom, val in shapes:
-        if val != 1:
-            continue
-        poly = shape(geom)
-        area_km2 = _area_km2(poly)
-        if area_km2 < min_area_km2:
-            continue
-
-        poly_mask = _geom_mask(poly, score_da)
-        poly_scores = score[poly_mask]
-        mean_score = float(np.nanmean(poly_scores))
-        max_score = float(np.nanmax(poly_scores))
-
-        evidence = compute_evidence(poly_mask, evidence_layers, thresholds, mode)
+        region_labels.append(int(val))
+        polys.append(shape(geom))
+    if not polys:
+        return []
+    polys = np.array(polys, dtype=object)
+
+    # Measure in meters: a projected grid (the native Sentinel-2 UTM one) is used as is; a
+    # geographic grid is projected to the UTM zone of its centre. Lines follow into that CRS.
+    src_crs = pyproj.CRS.from_user_input(crs) if crs else crs_from_epsg(4326)
+    if src_crs.is_geographic:
+        minx, miny, maxx, maxy = score_da.rio.bounds()
+        utm_epsg = utm_epsg_from_lonlat((minx + maxx) / 2, (miny + maxy) / 2)
+        metric_crs = crs_from_epsg(utm_epsg)
+        polys_proj = _project(polys, _transformer(src_crs, utm_epsg))
+    else:
+        metric_crs = src_crs
+        polys_proj = polys
+    # planar area in the local UTM zone stays well within 0.5% of the geodesic one
+    areas_km2 = shapely.area(polys_proj) * 1e-6
+    keep = areas_km2 >= min_area_km2
+    if not keep.any():
+        return []
+    polys, polys_proj, areas_km2 = polys[keep], polys_proj[keep], areas_km2[keep].tolist()
+    region_labels = np.asarray(region_labels)[keep].tolist()
+
+    road_dists = _distance_to_lines(polys_proj, _line_tree(roads_gdf, metric_crs))
+    river_dists = _distance_to_lines(polys_proj, _line_tree(rivers_gdf, metric_crs))
+
+    # per-region stats for the kept labels, in the same order
+    mean_scores = ndimage.mean(score, labels, region_labels).tolist()
+    max_scores = ndimage.maximum(score, labels, region_labels).tolist()
+    # the centroid of a union of equal pixels is the mean of their centres
+    rows, cols = np.asarray(ndimage.center_of_mass(mask, labels, region_labels)).reshape(-1, 2).T
+    centroids = shapely.points(*(transform * (cols + 0.5, rows + 0.5)))
+    evidence_rows = compute_evidence(labels, region_labels, evidence_layers, thresholds, mode)
+
+    targets = []
+    for i, (poly, area_km2) in enumerate(zip(polys, areas_km2)):
+        evidence = evidence_rows[i]
         chips = evidence_chips(evidence, mode)
 
         targets.append(
@@ -105,11 +138,11 @@ def extract_targets(
                 "id": str(uuid.uuid4()),
                 "geometry": poly,
                 "area_km2": area_km2,
-                "centroid": poly.centroid,
-                "mean_score": mean_score,
-                "max_score": max_score,
-                "distance_to_road_m": _distance_to_lines(poly, roads_gdf),
-                "distance_to_river_m": _distance_to_lines(poly, rivers_gdf),
+                "centroid": centroids[i],
+                "mean_score": mean_scores[i],
+                "max_score": max_scores[i],
+                "distance_to_road_m": road_dists[i],
+                "distance_to_river_m": river_dists[i],
                 "evidence": evidence,
                 "evidence_summary": chips,
             }
@@ -119,28 +152,36 @@ def extract_targets(
     return targets
 
 
-def compute_evidence(poly_mask: np.ndarray, layers: Dict[str, xr.DataArray], thresholds: Dict[str, float], mode: str) -> Dict:
+_COMPARE = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+
+
+def compute_evidence(labels: np.ndarray, index: List[int],
+                     layers: Union[xr.Dataset, Dict[str, xr.DataArray]],
+                     thresholds: Dict[str, float], mode: str) -> List[Dict]:
+    zeros = np.zeros(len(index))
+
     def _mean(name):
         arr = layers[name].values
-        return float(np.nanmean(arr[poly_mask]))
+        valid = ~np.isnan(arr)
+        if valid.all():
+            return ndimage.mean(arr, labels, index)
+        # NaN-aware mean from per-region sums and counts of valid pixels
+        sums = ndimage.sum(np.where(valid, arr, 0), labels, index)
+        counts = ndimage.sum(valid.view(np.uint8), labels, index)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts
+
+    def _fraction(hit):
+        # share of each region's pixels that pass, one C pass over the raster
+        return ndimage.mean(hit.view(np.uint8), labels, index)
 
     def _pct(name, op, thr):
-        arr = layers[name].values
-        vals = arr[poly_mask]
-        if vals.size == 0:
-            return 0.0
-        if op == "<":
-            return float(np.mean(vals < thr))
-        if op == "<=":
-            return float(np.mean(vals <= thr))
-        if op == ">":
-            return float(np.mean(vals > thr))
-        if op == ">=":
-            return float(np.mean(vals >= thr))
-        return 0.0
+        if op not in _COMPARE:
+            return zeros
+        return _fraction(_COMPARE[op](layers[name].values, thr))
 
     if mode == "coastal":
-        ev = {
+        columns = {
             "ndvi_mean": _mean("ndvi"),
             "ndwi_mean": _mean("ndwi"),
             "bsi_mean": _mean("bsi"),
@@ -154,23 +195,25 @@ def compute_evidence(poly_mask: np.ndarray, layers: Dict[str, xr.DataArray], thr
             "pct_near_river": _pct("dist_river", "<=", thresholds["river_max_m"]),
         }
     else:
-        vals = layers["slope"].values[poly_mask]
-        pct_relief = 0.0
-        if vals.size > 0:
-            pct_relief = float(((vals >= thresholds["slope_min"]) & (vals <= thresholds["slope_max"])).mean())
+        slope = layers["slope"].values
+        relief = (slope >= thresholds["slope_min"]) & (slope <= thresholds["slope_max"])
 
-        ev = {
+        columns = {
             "ndvi_mean": _mean("ndvi"),
             "ndwi_mean": _mean("ndwi"),
             "slope_mean": _mean("slope"),
             "lineament_mean": _mean("lineaments"),
-            "geology_mask_mean": _mean("geology_mask") if "geology_mask" in layers else 0.0,
+            "geology_mask_mean": _mean("geology_mask") if "geology_mask" in layers else zeros,
             "pct_lineament_high": _pct("lineaments", ">=", thresholds["lineament_threshold_value"]),
-            "pct_relief": pct_relief,
+            "pct_relief": _fraction(relief),
             "pct_low_ndvi": _pct("ndvi", "<=", thresholds["ndvi_max"]),
-            "pct_geology_match": _pct("geology_mask", ">=", 0.5) if "geology_mask" in layers else 0.0,
+            "pct_geology_match": (
+                _pct("geology_mask", ">=", 0.5) if "geology_mask" in layers else zeros
+            ),
         }
-    return ev
+    names = list(columns)
+    rows = zip(*(np.asarray(columns[name], dtype=float).tolist() for name in names))
+    return [dict(zip(names, row)) for row in rows]
 
 
 def evidence_chips(evidence: Dict, mode: str) -> List[str]:
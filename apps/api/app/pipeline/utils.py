@@ -1,65 +1,260 @@
 import hashlib
-import json
 import os
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple, Union
 
 import numpy as np
+import orjson
 import pyproj
+import xarray as xr
 from shapely.geometry import shape, mapping
+from shapely.geometry.base import BaseGeometry
 from shapely.ops import transform as shp_transform
 
+try:
+    import bottleneck as bn
+except Exception:  # pragma: no cover - optional accelerator, numpy is the fallback
+    bn = None
+
+# bottleneck's NaN reductions are a tight C loop over float32, without numpy's ufunc machinery
+_nanmin = bn.nanmin if bn is not None else np.nanmin
+_nanmax = bn.nanmax if bn is not None else np.nanmax
+
+try:
+    import dask
+    import dask.array as dsa
+except Exception:  # pragma: no cover - lazy rasters need dask; plain numpy input does not
+    dask = None
+    dsa = None
+
 
 def ensure_dir(path: str) -> str:
     Path(path).mkdir(parents=True, exist_ok=True)
     return path
 
 
-def aoi_bounds(aoi_geojson: Dict) -> Tuple[float, float, float, float]:
-    geom = shape(aoi_geojson.get("geometry", aoi_geojson))
-    return geom.bounds
+def aoi_geom(aoi: Union[Dict, BaseGeometry]) -> BaseGeometry:
+    # Accept an already parsed geometry so callers needing several AOI properties parse once
+    if isinstance(aoi, BaseGeometry):
+        return aoi
+    return shape(aoi.get("geometry", aoi))
+
+
+def aoi_bounds(aoi: Union[Dict, BaseGeometry]) -> Tuple[float, float, float, float]:
+    return aoi_geom(aoi).bounds
+
+
+@lru_cache(maxsize=None)
+def _equal_area_transformer() -> pyproj.Transformer:
+    # PROJ database lookup and pipeline setup cost far more than the transform itself
+    return pyproj.Transformer.from_crs("EPSG:4326", "EPSG:6933", always_xy=True)
+
+
+_WGS84_GEOD = pyproj.Geod(ellps="WGS84")
+
+# Below this bbox extent (degrees) AOI area is measured geodesically on the raw lon/lat vertices
+GEODESIC_AREA_MAX_DEG = 1.0
 
 
-def aoi_area_km2(aoi_geojson: Dict) -> float:
-    geom = shape(aoi_geojson.get("geometry", aoi_geojson))
+def geodesic_area_km2(geom: BaseGeometry) -> float:
+    area, _ = _WGS84_GEOD.geometry_area_perimeter(geom)
+    return abs(area) / 1_000_000.0
+
+
+def aoi_area_km2(aoi: Union[Dict, BaseGeometry]) -> float:
+    geom = aoi_geom(aoi)
+    minx, miny, maxx, maxy = geom.bounds
+    if maxx - minx < GEODESIC_AREA_MAX_DEG and maxy - miny < GEODESIC_AREA_MAX_DEG:
+        # exact on the ellipsoid and skips building a reprojected copy of the polygon
+        return geodesic_area_km2(geom)
     # Use equal area projection for rough area
-    proj = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:6933", always_xy=True).transform
-    geom_eq = shp_transform(proj, geom)
+    geom_eq = shp_transform(_equal_area_transformer().transform, geom)
     return abs(geom_eq.area) / 1_000_000.0
 
 
-def utm_crs_from_lonlat(lon: float, lat: float) -> str:
-    zone = int((lon + 180) / 6) + 1
-    hemisphere = "326" if lat >= 0 else "327"
-    return f"EPSG:{hemisphere}{zone:02d}"
+def utm_epsg_from_lonlat(lon, lat) -> Union[int, np.ndarray]:
+    # Integer EPSG code (e.g. 32643) for a point, or an array of codes for arrays of points;
+    # pass it to crs_from_epsg rather than round-tripping an "EPSG:..." string
+    zone = np.floor_divide(np.asarray(lon, dtype="float64") + 180, 6).astype(np.int64) + 1
+    epsg = np.where(np.asarray(lat) >= 0, 32600, 32700) + zone
+    return int(epsg) if epsg.ndim == 0 else epsg
+
+
+@lru_cache(maxsize=512)
+def crs_from_epsg(epsg: int) -> pyproj.CRS:
+    # from_epsg is pyproj's cheapest constructor, and AOIs reuse a handful of codes
+    return pyproj.CRS.from_epsg(epsg)
 
 
 def hash_str(value: str) -> str:
-    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+    # cache keys only: an 8-byte BLAKE2b digest is the same 16 hex chars, computed faster
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def nan_quantiles(a: np.ndarray, q) -> np.ndarray:
+    # One partition for every requested quantile; skip the NaN-aware path when it isn't needed.
+    if np.isnan(a).any():
+        return np.nanquantile(a, q)
+    return np.quantile(a, q)
+
+
+def _is_dask(arr) -> bool:
+    return dsa is not None and isinstance(arr, dsa.Array)
+
+
+def _lazy(fn):
+    # DataArrays are unwrapped to their backing array (dask stays dask) and rewrapped on the way out
+    @wraps(fn)
+    def wrapper(arr, *args, **kwargs):
+        if isinstance(arr, xr.DataArray):
+            return arr.copy(data=fn(arr.data, *args, **kwargs))
+        return fn(arr, *args, **kwargs)
 
+    return wrapper
+
+
+def _normalize_block(block: np.ndarray, min_val: float, max_val: float) -> np.ndarray:
+    a = block.astype("float32")
+    a -= min_val
+    a /= max_val - min_val
+    np.clip(a, 0, 1, out=a)
+    return a
+
+
+@_lazy
+def normalize_minmax(arr: Union[np.ndarray, xr.DataArray, "dsa.Array"], min_val: float = None,
+                     max_val: float = None):
+    if _is_dask(arr):
+        # both reductions share one pass over the chunks; the rescale itself stays lazy
+        lo = dsa.nanmin(arr) if min_val is None else min_val
+        hi = dsa.nanmax(arr) if max_val is None else max_val
+        min_val, max_val = (float(v) for v in dask.compute(lo, hi))
+        if max_val - min_val == 0:
+            return dsa.zeros(arr.shape, dtype="float32", chunks=arr.chunks)
+        return arr.map_blocks(_normalize_block, min_val, max_val, dtype="float32")
 
-def normalize_minmax(arr: np.ndarray, min_val: float = None, max_val: float = None) -> np.ndarray:
     a = arr.astype("float32")
     if min_val is None:
-        min_val = np.nanmin(a)
+        min_val = _nanmin(a)
     if max_val is None:
-        max_val = np.nanmax(a)
+        max_val = _nanmax(a)
     if max_val - min_val == 0:
         return np.zeros_like(a)
-    return np.clip((a - min_val) / (max_val - min_val), 0, 1)
+    # astype() already copied, so rescale that buffer in place instead of allocating
+    # three temporaries
+    a -= min_val
+    a /= max_val - min_val
+    np.clip(a, 0, 1, out=a)
+    return a
+
+
+# Above this many pixels, float rasters are scaled through binned percentiles and a per-bin LUT
+HIST_PERCENTILE_MIN_SIZE = 1_000_000
+HIST_BINS = 65536
+
+
+def _count_percentiles(counts: np.ndarray, pmin: float, pmax: float) -> Tuple[float, float]:
+    # Exact linear-interpolated percentiles (numpy's default method) from per-value counts
+    cdf = np.cumsum(counts)
+    pos = np.array((pmin, pmax)) * 0.01 * (cdf[-1] - 1)
+    below = np.floor(pos)
+    v0 = np.searchsorted(cdf, below, side="right")
+    v1 = np.searchsorted(cdf, np.minimum(below + 1, cdf[-1] - 1), side="right")
+    lo, hi = v0 + (v1 - v0) * (pos - below)
+    return float(lo), float(hi)
+
+
+def _rescale_to_uint8(a: np.ndarray, lo: float, hi: float, dither: bool) -> np.ndarray:
+    # `a` is a float32 buffer the caller owns: rescale it in place rather than through temporaries
+    a -= lo
+    a /= hi - lo
+    np.clip(a, 0, 1, out=a)
+    a *= 255
+    if dither:
+        # uniform noise in [-0.5, 0.5) before rounding trades banding in smooth gradients for grain
+        a += np.random.default_rng().random(a.shape, dtype=np.float32)
+        a -= 0.5
+        np.clip(a, 0, 255, out=a)
+    # round to the nearest level; a bare cast truncates and biases everything down half a step
+    np.rint(a, out=a)
+    # NaN pixels map to 0, as on the binned path, instead of an undefined cast
+    np.copyto(a, 0, where=np.isnan(a))
+    return a.astype(np.uint8)
 
 
-def scale_to_uint8(arr: np.ndarray, pmin: float = 2, pmax: float = 98) -> np.ndarray:
+def _binned_scale_to_uint8(a: np.ndarray, pmin: float, pmax: float) -> Optional[np.ndarray]:
+    # Quantize every pixel to one of HIST_BINS - 1 uniform bins once (NaN -> the last index), then
+    # take the percentiles from the bin counts and the output from a per-bin LUT. This shares one
+    # index pass between the histogram and the rescale instead of a histogram plus a float rescale.
+    lo_g, hi_g = float(_nanmin(a)), float(_nanmax(a))
+    if not (np.isfinite(lo_g) and np.isfinite(hi_g)) or lo_g == hi_g:
+        return None
+    nan_bin = HIST_BINS - 1
+    step = (hi_g - lo_g) / (nan_bin - 1)
+    f = a - np.float32(lo_g)
+    f *= np.float32(1 / step)
+    # fmin returns the non-NaN operand, so NaN pixels land in nan_bin; data tops out at nan_bin - 1
+    np.fmin(f, nan_bin, out=f)
+    idx = f.astype(np.uint16)
+    del f
+    counts = np.bincount(idx.ravel(), minlength=HIST_BINS)
+    lo, hi = _count_percentiles(counts[:nan_bin], pmin, pmax)
+    if hi - lo == 0:
+        return np.zeros(a.shape, dtype=np.uint8)
+    lut = _rescale_to_uint8(np.arange(HIST_BINS, dtype=np.float32), lo, hi, dither=False)
+    lut[nan_bin] = 0
+    return lut[idx]
+
+
+def _scale_block(block: np.ndarray, lo: float, hi: float, dither: bool) -> np.ndarray:
+    return _rescale_to_uint8(block.astype("float32"), lo, hi, dither)
+
+
+@_lazy
+def scale_to_uint8(arr: Union[np.ndarray, xr.DataArray, "dsa.Array"], pmin: float = 2,
+                   pmax: float = 98, dither: bool = False):
+    """Stretch the pmin..pmax percentile range to 0..255; NaN pixels become 0.
+
+    numpy input is exact except for rasters above HIST_PERCENTILE_MIN_SIZE, which are within
+    one level. For dask input the percentiles are merged per chunk and only approximate, so
+    the stretch can differ from the numpy result by a few levels.
+    """
+    if _is_dask(arr):
+        # Per-chunk percentiles merged by dask: approximate, but parallel and never holding the
+        # whole raster. Output stays lazy; callers that need numpy call .compute().
+        flat = arr.ravel()
+        flat = flat[~dsa.isnan(flat)] if np.issubdtype(arr.dtype, np.floating) else flat
+        lo, hi = (float(v) for v in dsa.percentile(flat, [pmin, pmax]).compute())
+        if hi - lo == 0:
+            return dsa.zeros(arr.shape, dtype=np.uint8, chunks=arr.chunks)
+        return arr.map_blocks(_scale_block, lo, hi, dither, dtype=np.uint8)
+
+    if arr.dtype in (np.uint8, np.uint16) and arr.size and not dither:
+        # Small integer domain: exact percentiles from a bincount and a per-level lookup table,
+        # so the raster itself is never promoted to float32.
+        counts = np.bincount(arr.ravel(), minlength=np.iinfo(arr.dtype).max + 1)
+        lo, hi = _count_percentiles(counts, pmin, pmax)
+        if hi - lo == 0:
+            return np.zeros(arr.shape, dtype=np.uint8)
+        lut = _rescale_to_uint8(np.arange(counts.size, dtype=np.float32), lo, hi, dither=False)
+        return lut[arr]
+
+    if arr.size > HIST_PERCENTILE_MIN_SIZE and not dither:
+        out = _binned_scale_to_uint8(arr, pmin, pmax)
+        if out is not None:
+            return out
+
+    # exact path: small rasters, dithered output, and inputs the binned path cannot take
     a = arr.astype("float32")
-    lo = np.nanpercentile(a, pmin)
-    hi = np.nanpercentile(a, pmax)
+    lo, hi = nan_quantiles(a, (pmin * 0.01, pmax * 0.01))
     if hi - lo == 0:
         return np.zeros_like(a, dtype=np.uint8)
-    scaled = np.clip((a - lo) / (hi - lo), 0, 1)
-    return (scaled * 255).astype(np.uint8)
+    return _rescale_to_uint8(a, lo, hi, dither)
 
 
 def safe_json_dump(obj: Dict, path: str):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
-
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(
+            obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ))
@@ -1,38 +1,122 @@
+import logging
+import threading
+import time
 from typing import Dict, Optional
 
+import numpy as np
+import shapely
+
 from .db import update_run, insert_targets
 from .pipeline.run import run_pipeline
 
+# Steps reported closer together than this are coalesced into a single progress UPDATE
+PROGRESS_MIN_INTERVAL_S = 0.25
+_FINAL_STEP = "generate_outputs"
+
+logger = logging.getLogger(__name__)
+
+
+def _hex_ewkb(geoms) -> list:
+    # one GEOS call for the whole column instead of a per-geometry dumps()
+    geoms = shapely.set_srid(np.array(geoms, dtype=object), 4326)
+    return shapely.to_wkb(geoms, hex=True, include_srid=True).tolist()
+
+
+class _ProgressThrottle:
+    """Coalesce progress steps closer than PROGRESS_MIN_INTERVAL_S into one DB write.
+
+    A held-back step is written by a trailing timer once the interval has passed, so a
+    long stage that follows a burst of fast ones still shows as running. Progress writes
+    never fail the pipeline mid-stage: errors are logged, and the first one is re-raised
+    by close(flush=True).
+    """
 
-def process_run(run_id: str, aoi: Dict, mode: str, params: Dict, geology_geojson: Optional[Dict] = None):
-    def progress_cb(step):
+    def __init__(self, write):
+        self._write = write
+        self._lock = threading.Lock()
+        self._last = float("-inf")
+        self._pending = None
+        self._timer = None
+        self._error = None
+
+    def _flush_locked(self, step):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = None
+        self._last = time.monotonic()
+        try:
+            self._write(step)
+        except Exception as e:
+            logger.exception("progress update %r failed", step)
+            if self._error is None:
+                self._error = e
+
+    def _flush_pending(self):
+        # runs on the Timer thread; _flush_locked logs write errors instead of raising them
+        with self._lock:
+            self._timer = None
+            if self._pending is not None:
+                self._flush_locked(self._pending)
+
+    def __call__(self, step):
+        with self._lock:
+            wait = PROGRESS_MIN_INTERVAL_S - (time.monotonic() - self._last)
+            if step == _FINAL_STEP or wait <= 0:
+                self._flush_locked(step)
+                return
+            self._pending = step
+            if self._timer is None:
+                self._timer = threading.Timer(wait, self._flush_pending)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def close(self, flush: bool):
+        # Stop the trailing timer. With flush, write the step still held back and surface
+        # the first write error seen during the run.
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if flush and self._pending is not None:
+                self._flush_locked(self._pending)
+            self._pending = None
+            if flush and self._error is not None:
+                raise self._error
+
+
+def process_run(run_id: str, aoi: Dict, mode: str, params: Dict,
+                geology_geojson: Optional[Dict] = None):
+    def write_progress(step):
         from .main import _update_progress
         _update_progress(run_id, step)
 
+    progress_cb = _ProgressThrottle(write_progress)
+
     try:
         update_run(run_id, status="running")
-        result = run_pipeline(run_id, aoi, mode, params or {}, geology_geojson, progress_cb=progress_cb)
+        result = run_pipeline(run_id, aoi, mode, params or {}, geology_geojson,
+                              progress_cb=progress_cb)
+        # no late progress write may land after the final status below; a progress write
+        # that failed during the run fails it here
+        progress_cb.close(flush=True)
         targets = result["targets"]
         insert_targets(
             run_id,
-            [
-                {
-                    "id": t["id"],
-                    "wkt": t["geometry"].wkt,
-                    "centroid_wkt": t["centroid"].wkt,
-                    "area_km2": t["area_km2"],
-                    "mean_score": t["mean_score"],
-                    "max_score": t["max_score"],
-                    "distance_to_road_m": t["distance_to_road_m"],
-                    "distance_to_river_m": t["distance_to_river_m"],
-                    "evidence": t["evidence"],
-                    "evidence_summary": t["evidence_summary"],
-                }
-                for t in targets
-            ],
+            ids=[t["id"] for t in targets],
+            wkbs=_hex_ewkb([t["geometry"] for t in targets]),
+            centroid_wkbs=_hex_ewkb([t["centroid"] for t in targets]),
+            areas=[t["area_km2"] for t in targets],
+            mean_scores=[t["mean_score"] for t in targets],
+            max_scores=[t["max_score"] for t in targets],
+            road_dists=[t["distance_to_road_m"] for t in targets],
+            river_dists=[t["distance_to_river_m"] for t in targets],
+            evidence=[t["evidence"] for t in targets],
+            evidence_summary=[t["evidence_summary"] for t in targets],
         )
         progress = {"steps": {}}
-        for step in ["fetch_imagery", "fetch_dem", "fetch_osm", "compute_features", "score", "extract_targets", "generate_outputs"]:
+        for step in ["fetch_imagery", "fetch_dem", "fetch_osm", "compute_features", "score",
+                     "extract_targets", "generate_outputs"]:
             progress["steps"][step] = "done"
         update_run(
             run_id,
@@ -46,4 +130,9 @@ def process_run(run_id: str, aoi: Dict, mode: str, params: Dict, geology_geojson
             progress=progress,
         )
     except Exception as e:
+        # record the step that was running when the run failed
+        try:
+            progress_cb.close(flush=True)
+        except Exception:
+            pass  # already logged; the pipeline error below is the one to report
         update_run(run_id, status="failed", error=str(e))
@@ -0,0 +1,125 @@
+import os
+import time
+import uuid
+
+import psycopg
+import pytest
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+
+from app import db, tasks
+
+# Runs the real SQL against a scratch schema; set TEST_DATABASE_URL to a Postgres the tests may
+# create and drop schemas in.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+STEPS = {
+    "fetch_imagery": "pending",
+    "fetch_dem": "pending",
+    "fetch_osm": "pending",
+    "compute_features": "pending",
+    "score": "pending",
+    "extract_targets": "pending",
+    "generate_outputs": "pending",
+}
+
+
+@pytest.fixture
+def runs_db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+        conn.execute(f"CREATE TABLE {schema}.runs (id UUID PRIMARY KEY, progress JSONB)")
+        # geometry columns as text: the COPY path is what is under test, not PostGIS
+        conn.execute(
+            f"""
+            CREATE TABLE {schema}.targets (
+                id UUID PRIMARY KEY, run_id UUID, geom TEXT, area_km2 DOUBLE PRECISION,
+                centroid TEXT, mean_score DOUBLE PRECISION, max_score DOUBLE PRECISION,
+                distance_to_road_m DOUBLE PRECISION, distance_to_river_m DOUBLE PRECISION,
+                evidence JSONB, evidence_summary JSONB
+            )
+            """
+        )
+    pool = ConnectionPool(TEST_DATABASE_URL, min_size=1, max_size=2, open=True,
+                          kwargs={"options": f"-c search_path={schema}"})
+    monkeypatch.setattr(db, "_pool", pool)
+    try:
+        yield schema
+    finally:
+        pool.close()
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def _new_run(progress=None):
+    run_id = str(uuid.uuid4())
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO runs (id, progress) VALUES (%s, %s)",
+                     (run_id, Jsonb(progress) if progress is not None else None))
+        conn.commit()
+    return run_id
+
+
+def _steps(run_id):
+    with db.get_conn() as conn:
+        row = conn.execute("SELECT progress->'steps' FROM runs WHERE id = %s", (run_id,)).fetchone()
+    return row[0]
+
+
+def test_advance_progress_marks_running_step(runs_db):
+    run_id = _new_run({"steps": dict(STEPS)})
+    db.advance_progress(run_id, "fetch_imagery", STEPS)
+    db.advance_progress(run_id, "fetch_dem", STEPS)
+    steps = _steps(run_id)
+    assert steps["fetch_imagery"] == "done"
+    assert steps["fetch_dem"] == "running"
+    assert steps["fetch_osm"] == "pending"
+
+
+def test_advance_progress_without_progress_uses_template(runs_db):
+    run_id = _new_run()
+    db.advance_progress(run_id, "fetch_imagery", STEPS)
+    assert _steps(run_id)["fetch_imagery"] == "running"
+
+
+def test_progress_throttle_flushes_held_back_steps(runs_db, monkeypatch):
+    monkeypatch.setattr(tasks, "PROGRESS_MIN_INTERVAL_S", 0.2)
+    run_id = _new_run({"steps": dict(STEPS)})
+    progress = tasks._ProgressThrottle(lambda step: db.advance_progress(run_id, step, STEPS))
+
+    progress("fetch_imagery")
+    progress("fetch_dem")
+    progress("fetch_osm")
+    progress("compute_features")
+    assert _steps(run_id)["fetch_imagery"] == "running"
+
+    # the trailing timer writes the last held-back step; the skipped ones end up done
+    time.sleep(0.5)
+    steps = _steps(run_id)
+    assert steps["compute_features"] == "running"
+    assert [steps[s] for s in ("fetch_imagery", "fetch_dem", "fetch_osm")] == ["done"] * 3
+    assert steps["score"] == "pending"
+
+    progress("score")
+    progress.close(flush=True)
+    assert _steps(run_id)["score"] == "running"
+
+
+def test_insert_targets_writes_missing_distances_as_null(runs_db):
+    run_id = _new_run()
+    ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+    db.insert_targets(
+        run_id, ids=ids, wkbs=["g0", "g1"], centroid_wkbs=["c0", "c1"], areas=[1.0, 2.0],
+        mean_scores=[0.9, 0.8], max_scores=[1.0, 0.9], road_dists=[float("nan"), 12.5],
+        river_dists=[None, float("nan")], evidence=[{"ndvi_mean": 0.1}, {}],
+        evidence_summary=[["Near rivers"], []],
+    )
+    with db.get_conn() as conn:
+        rows = conn.execute(
+            "SELECT distance_to_road_m, distance_to_river_m, evidence FROM targets"
+            " ORDER BY area_km2"
+        ).fetchall()
+    assert rows == [(None, None, {"ndvi_mean": 0.1}), (12.5, None, {})]
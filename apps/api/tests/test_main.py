@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import main
+
+
+def test_sentinel_routes_serve_preview_with_its_media_type(tmp_path, monkeypatch):
+    path = tmp_path / "sentinel_preview.webp"
+    Image.new("RGB", (4, 4)).save(path, "WEBP")
+    monkeypatch.setattr(main, "get_run_meta", lambda run_id: {"sentinel_preview_path": str(path)})
+    client = TestClient(main.app)
+
+    for url in ("/runs/abc/sentinel", "/runs/abc/sentinel.png"):
+        resp = client.get(url)
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "image/webp"
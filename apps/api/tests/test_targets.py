@@ -1,10 +1,22 @@
 import numpy as np
 import xarray as xr
 import rioxarray  # noqa: F401
+import geopandas as gpd
+import pyproj
 from affine import Affine
+from shapely.geometry import LineString
 
 from app.pipeline.targets import extract_targets, evidence_chips
 
+COASTAL_LAYERS = ("ndvi", "ndwi", "bsi", "slope", "dist_coast", "dist_river")
+COASTAL_THRESHOLDS = {
+    "slope_max": 5,
+    "ndvi_max": 0.2,
+    "bsi_threshold_value": 0.5,
+    "coast_max_m": 30000,
+    "river_max_m": 10000,
+}
+
 
 def make_da(data):
     da = xr.DataArray(data, dims=("y", "x"))
@@ -24,15 +36,67 @@ def test_extract_targets_min_area_filters():
         threshold=0.9,
         min_area_km2=10.0,
         mode="coastal",
-        evidence_layers={"ndvi": score_da, "ndwi": score_da, "bsi": score_da, "slope": score_da,
-                         "dist_coast": score_da, "dist_river": score_da},
-        thresholds={"slope_max": 5, "ndvi_max": 0.2, "bsi_threshold_value": 0.5, "coast_max_m": 30000, "river_max_m": 10000},
+        evidence_layers=xr.Dataset({name: score_da for name in COASTAL_LAYERS}),
+        thresholds=COASTAL_THRESHOLDS,
         roads_gdf=None,
         rivers_gdf=None,
     )
     assert len(targets) == 0
 
 
+def test_extract_targets_evidence_from_dataset():
+    data = np.zeros((10, 10), dtype="float32")
+    data[0:2, 0:2] = 0.95
+    score_da = make_da(data)
+    layers = xr.Dataset({name: score_da for name in COASTAL_LAYERS})
+
+    targets = extract_targets(
+        score_da,
+        threshold=0.9,
+        min_area_km2=1.0,
+        mode="coastal",
+        evidence_layers=layers,
+        thresholds=COASTAL_THRESHOLDS,
+        roads_gdf=None,
+        rivers_gdf=None,
+    )
+    assert len(targets) == 1
+    evidence = targets[0]["evidence"]
+    assert np.isclose(evidence["ndvi_mean"], 0.95)
+    assert evidence["pct_high_bsi"] == 1.0
+    assert evidence["pct_low_ndvi"] == 0.0
+
+
+def test_extract_targets_projected_grid():
+    data = np.zeros((300, 300), dtype="float32")
+    data[50:150, 50:150] = 0.95
+    score_da = xr.DataArray(data, dims=("y", "x"))
+    score_da.rio.write_crs("EPSG:32643", inplace=True)
+    transform = Affine.translation(700_000, 3_100_000) * Affine.scale(10, -10)
+    score_da.rio.write_transform(transform, inplace=True)
+    layers = xr.Dataset({name: score_da for name in COASTAL_LAYERS})
+    # a north-south river 500 m east of the block, given in lon/lat like the OSM layers
+    river_x = 700_000 + 150 * 10 + 500
+    lonlat = pyproj.Transformer.from_crs("EPSG:32643", "EPSG:4326", always_xy=True)
+    river = LineString([lonlat.transform(river_x, 3_100_000), lonlat.transform(river_x, 3_097_000)])
+    rivers = gpd.GeoDataFrame(geometry=[river], crs="EPSG:4326")
+
+    targets = extract_targets(
+        score_da,
+        threshold=0.9,
+        min_area_km2=0.5,
+        mode="coastal",
+        evidence_layers=layers,
+        thresholds=COASTAL_THRESHOLDS,
+        roads_gdf=None,
+        rivers_gdf=rivers,
+    )
+    assert len(targets) == 1
+    assert np.isclose(targets[0]["area_km2"], 1.0)
+    assert abs(targets[0]["distance_to_river_m"] - 500) < 1
+    assert targets[0]["distance_to_road_m"] is None
+
+
 def test_evidence_chips_deterministic():
     evidence = {
         "pct_near_coast": 0.8,
@@ -0,0 +1,24 @@
+import pytest
+
+from app import tasks
+
+
+def test_progress_throttle_defers_write_errors_to_close(monkeypatch):
+    monkeypatch.setattr(tasks, "PROGRESS_MIN_INTERVAL_S", 0)
+    written = []
+
+    def write(step):
+        if step == "fetch_dem":
+            raise RuntimeError("db down")
+        written.append(step)
+
+    progress = tasks._ProgressThrottle(write)
+    progress("fetch_imagery")
+    progress("fetch_dem")
+    # a failed write does not reach the pipeline
+    progress("generate_outputs")
+    assert written == ["fetch_imagery", "generate_outputs"]
+
+    progress.close(flush=False)
+    with pytest.raises(RuntimeError, match="db down"):
+        progress.close(flush=True)
@@ -0,0 +1,42 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from app.pipeline.utils import HIST_PERCENTILE_MIN_SIZE, nan_quantiles, scale_to_uint8
+
+
+def exact_scale(arr, pmin=2, pmax=98):
+    a = arr.astype("float32")
+    lo, hi = nan_quantiles(a, (pmin * 0.01, pmax * 0.01))
+    out = np.clip((a - lo) / (hi - lo), 0, 1) * 255
+    return np.rint(np.nan_to_num(out)).astype(np.uint8)
+
+
+def test_scale_to_uint8_integer_lut_matches_exact():
+    rng = np.random.default_rng(0)
+    for dtype, high in ((np.uint8, 256), (np.uint16, 4000)):
+        arr = rng.integers(0, high, size=(300, 200)).astype(dtype)
+        np.testing.assert_array_equal(scale_to_uint8(arr), exact_scale(arr))
+
+
+def test_scale_to_uint8_binned_within_one_level():
+    rng = np.random.default_rng(0)
+    arr = rng.gamma(2, 1000, size=HIST_PERCENTILE_MIN_SIZE + 1000).astype("float32")
+    arr[::97] = np.nan
+    valid = ~np.isnan(arr)
+    diff = np.abs(scale_to_uint8(arr).astype(int) - exact_scale(arr).astype(int))
+    assert diff[valid].max() <= 1
+    assert (scale_to_uint8(arr)[~valid] == 0).all()
+
+
+def test_scale_to_uint8_dask_maps_nan_to_zero():
+    dask_array = pytest.importorskip("dask.array")
+    rng = np.random.default_rng(0)
+    arr = rng.random((200, 300)).astype("float32")
+    arr[::7, ::5] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        out = scale_to_uint8(dask_array.from_array(arr, chunks=64)).compute()
+    assert (out[np.isnan(arr)] == 0).all()
+    assert (scale_to_uint8(arr)[np.isnan(arr)] == 0).all()
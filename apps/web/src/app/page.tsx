@@ -291,7 +291,7 @@ export default function HomePage() {
       ]
       map.addSource('sentinel', {
         type: 'image',
-        url: `${API_URL}/runs/${detail.id}/sentinel.png` as any,
+        url: `${API_URL}/runs/${detail.id}/sentinel` as any,
         coordinates: coords
       })
       map.addLayer({